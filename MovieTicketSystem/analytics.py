@@ -0,0 +1,264 @@
+import datetime
+import threading
+from itertools import compress, repeat
+import numpy as np
+from database import get_db
+import journal
+import seat_layouts
+import seatmap
+
+# Occupancy, revenue and seat popularity reports for the admin dashboard,
+# computed with NumPy over every booking. Bookings are read ANALYTICS_CHUNK_SIZE
+# ids at a time, each column of a chunk joined by SQLite into one string:
+# handing over a few long strings is much cheaper than building a Python
+# tuple per row, and NumPy parses the numbers and dates back out in C. The
+# chunks are folded into totals per movie, hour of day, day and seat (see
+# `benchmark.py analytics` for how this compares with a loop over rows;
+# computing hours or ticket counts in SQL is slower). The totals are cached per
+# database file: a refresh reads only the bookings added since the last one,
+# unless the booking journal shows a cancellation since then, in which case
+# it starts over.
+#
+# NumPy is only needed here, and this module is only imported once the
+# dashboard asks for a report, so the app starts without it.
+
+# Range of booking ids read and converted to arrays at a time
+ANALYTICS_CHUNK_SIZE = 50000
+
+# Joins the seat lists and dates of a chunk; neither ever contains it
+SEPARATOR = '\x1f'
+
+# One row per chunk: the number of bookings, then each column of them joined
+# in the same order (aggregates step through the rows together)
+BOOKINGS_SQL = '''
+    SELECT COUNT(*), group_concat(COALESCE(movie_id, 0)), group_concat(COALESCE(showing_id, 0)),
+           group_concat(COALESCE(total_amount, 0)), group_concat(COALESCE(seats, ''), :sep),
+           group_concat(COALESCE(booking_date, ''), :sep)
+    FROM bookings
+    WHERE id > :after AND id <= :last AND cancelled_at IS NULL
+'''
+
+# Length of a "YYYY-MM-DD HH:MM:SS" booking date
+DATE_LENGTH = 19
+
+
+def add_counts(totals, index, weights=None):
+    # totals[index] += weights (or += 1), growing totals to fit the largest index
+    counts = np.bincount(index, weights=weights, minlength=len(totals))
+    if len(counts) > len(totals):
+        totals = np.concatenate([totals, np.zeros(len(counts) - len(totals), totals.dtype)])
+    return totals + counts.astype(totals.dtype)
+
+
+def parse_numbers(text, count, dtype):
+    values = np.fromstring(text, dtype, sep=',')
+    if len(values) != count:
+        raise ValueError(f"Expected {count} numbers, parsed {len(values)}")
+    return values
+
+
+def parse_dates(text, count):
+    # (epoch days, hours) of the joined booking dates, and a mask of those
+    # that parsed. Dates in the usual fixed-width form are read digit by
+    # digit from the bytes; anything else goes through datetime64 parsing.
+    if len(text) == count * (DATE_LENGTH + 1) - 1:
+        chars = np.frombuffer((text + SEPARATOR).encode('latin-1'), np.uint8).reshape(count, DATE_LENGTH + 1)
+        digits = chars[:, [0, 1, 2, 3, 5, 6, 8, 9, 11, 12]].astype(np.int64) - ord('0')
+        if ((digits >= 0) & (digits <= 9)).all():
+            year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+            month = digits[:, 4] * 10 + digits[:, 5]
+            day = digits[:, 6] * 10 + digits[:, 7]
+            hour = digits[:, 8] * 10 + digits[:, 9]
+            months = ((year - 1970) * 12 + month - 1).astype('datetime64[M]')
+            days = months.astype('datetime64[D]').astype(np.int64) + day - 1
+            return days, hour, (year >= 1970) & (month >= 1) & (month <= 12) & (hour < 24)
+    times = np.array(text.split(SEPARATOR), 'datetime64[s]')  # Unparsable dates become NaT
+    days = times.astype('datetime64[D]')
+    hours = (times.astype('datetime64[h]') - days).astype(np.int64)
+    return days.astype(np.int64), hours, ~np.isnat(times) & (times >= np.datetime64(0, 's'))
+
+
+def resized(values, size):
+    # values cut or padded with zeros to `size` entries
+    out = np.zeros(size, values.dtype)
+    out[:min(size, len(values))] = values[:size]
+    return out
+
+
+class BookingTotals:
+    # Running totals over the bookings with id <= last_id, as of journal
+    # event last_seq. Movies and days are array indexes (days since 1970).
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.last_id = 0
+        self.last_seq = 0
+        self.bookings = 0
+        self.movie_bookings = np.zeros(0, np.int64)
+        self.movie_tickets = np.zeros(0, np.int64)
+        self.movie_revenue = np.zeros(0)
+        self.hour_revenue = np.zeros(24)
+        self.day_revenue = np.zeros(0)
+        self.seat_counts = {}  # screen_id -> 2D array of tickets per row and column
+        self.screen_seats = {}  # (screen_id, seat id) -> (row, column)
+
+    def refresh(self, db):
+        with db.transaction() as conn:
+            # One read transaction, so the bookings and the journal position agree
+            cursor = conn.cursor()
+            seq = journal.last_seq(cursor)
+            last_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM bookings").fetchone()[0]
+            cancelled = cursor.execute("SELECT 1 FROM booking_events WHERE seq > ? AND kind = ? LIMIT 1",
+                                       (self.last_seq, journal.CANCELLED)).fetchone()
+            if cancelled or last_id < self.last_id:
+                self.reset()
+            self.last_seq = seq
+            if last_id == self.last_id:
+                return
+            layouts = dict(cursor.execute("SELECT id, layout FROM screens"))
+            showings = np.array(cursor.execute("SELECT id, screen_id FROM showings").fetchall(), np.int64).reshape(-1, 2)
+            screen_of = np.full(showings[:, 0].max(initial=0) + 1, -1, np.int64)
+            screen_of[showings[:, 0]] = showings[:, 1]
+            for after in range(self.last_id, last_id, ANALYTICS_CHUNK_SIZE):
+                chunk = cursor.execute(BOOKINGS_SQL, {'sep': SEPARATOR, 'after': after,
+                                                      'last': min(after + ANALYTICS_CHUNK_SIZE, last_id)}).fetchone()
+                if chunk[0]:
+                    self._add_chunk(*chunk, screen_of, layouts)
+            self.last_id = last_id
+
+    def _add_chunk(self, count, movies, showings, amounts, seats, dates, screen_of, layouts):
+        movies = parse_numbers(movies, count, np.int64)
+        showings = parse_numbers(showings, count, np.int64)
+        screens = np.where(showings < len(screen_of), screen_of[np.minimum(showings, len(screen_of) - 1)], -1)
+        amounts = parse_numbers(amounts, count, np.float64)
+        # Seats are stored as "A1,A2"
+        seats = seats.split(SEPARATOR)
+        tickets = (np.fromiter(map(str.count, seats, repeat(',')), np.int64, count)
+                   + (np.fromiter(map(len, seats), np.int64, count) > 0))
+        days, hours, dated = parse_dates(dates, count)
+
+        self.bookings += count
+        self.movie_bookings = add_counts(self.movie_bookings, movies)
+        self.movie_tickets = add_counts(self.movie_tickets, movies, tickets)
+        self.movie_revenue = add_counts(self.movie_revenue, movies, amounts)
+        self.hour_revenue = add_counts(self.hour_revenue, hours[dated], amounts[dated])
+        self.day_revenue = add_counts(self.day_revenue, days[dated], amounts[dated])
+
+        # Seats: split every seat list of the chunk at once, number the
+        # distinct seat ids, pair each seat with its booking's screen, and
+        # count each distinct (screen, seat) pair; only those few thousand
+        # pairs are looked up in the layouts
+        placed = (tickets > 0) & (screens >= 0)
+        if not placed.any():
+            return
+        seat_ids = ','.join(compress(seats, placed.tolist())).split(',')
+        names = list(set(seat_ids))
+        numbers = dict(zip(names, range(len(names))))
+        seat_index = np.fromiter(map(numbers.__getitem__, seat_ids), np.int64, len(seat_ids))
+        seat_screens = np.repeat(screens[placed], tickets[placed])
+        pairs, counts = np.unique(seat_screens * len(names) + seat_index, return_counts=True)
+        for pair, count in zip(pairs.tolist(), counts.tolist()):
+            screen_id, name = divmod(pair, len(names))
+            cell = self._seat_cell(screen_id, names[name].strip(), layouts)
+            if cell is not None:
+                self.seat_counts[screen_id][cell] += count
+
+    def _seat_cell(self, screen_id, seat_id, layouts):
+        # (row, column) of a seat, or None for a seat the screen does not have
+        key = (screen_id, seat_id)
+        if key not in self.screen_seats:
+            layout = layouts.get(screen_id)
+            cell = None
+            if layout is not None:
+                index = seatmap.seat_index(layout)
+                if screen_id not in self.seat_counts:
+                    self.seat_counts[screen_id] = np.zeros((len(index.rows), index.width), np.int64)
+                for row, seats in enumerate(index.rows):
+                    if seat_id in seats:
+                        cell = (row, seats.index(seat_id))
+                        break
+            self.screen_seats[key] = cell
+        return self.screen_seats[key]
+
+
+_totals = {}
+_totals_lock = threading.Lock()
+
+
+def booking_totals(db=None):
+    # The refreshed totals of a database
+    db = db or get_db()
+    with _totals_lock:
+        totals = _totals.get(db.path)
+        if totals is None:
+            totals = _totals[db.path] = BookingTotals()
+    with totals.lock:
+        totals.refresh(db)
+    return totals
+
+
+def clear_cache():
+    with _totals_lock:
+        _totals.clear()
+
+
+def dashboard_report(db=None):
+    # {'movies': per movie bookings, tickets, capacity, occupancy (share of
+    #  the seats of its current showings sold) and revenue, best occupancy
+    #  first; 'revenue_by_hour': 24 totals by hour of booking;
+    #  'revenue_by_day': [(YYYY-MM-DD, revenue)] for days with bookings;
+    #  'seat_heatmaps': per screen, tickets sold per seat as rows of columns
+    #  with None in the gaps; 'bookings': bookings counted}
+    db = db or get_db()
+    totals = booking_totals(db)
+    with totals.lock:
+        conn = db.connection()
+        capacity = {}
+        for movie_id, layout, showings in conn.execute('''
+                SELECT s.movie_id, c.layout, COUNT(*) FROM showings s JOIN screens c ON c.id = s.screen_id
+                GROUP BY s.movie_id, c.id
+        '''):
+            capacity[movie_id] = capacity.get(movie_id, 0) + seat_layouts.seat_count(layout) * showings
+        rows = conn.execute("SELECT id, title FROM movies").fetchall()
+        size = max([movie_id for movie_id, _ in rows], default=-1) + 1
+        bookings, tickets, revenue = (resized(values, size).tolist()
+                                      for values in (totals.movie_bookings, totals.movie_tickets, totals.movie_revenue))
+        movies = []
+        for movie_id, title in rows:
+            seats = capacity.get(movie_id, 0)
+            movies.append({
+                'movie_id': movie_id,
+                'title': title,
+                'bookings': bookings[movie_id],
+                'tickets': tickets[movie_id],
+                'capacity': seats,
+                'occupancy': tickets[movie_id] / seats if seats else None,
+                'revenue': round(revenue[movie_id], 2),
+            })
+        movies.sort(key=lambda movie: (-(movie['occupancy'] or 0), movie['title']))
+
+        epoch = datetime.date(1970, 1, 1)
+        revenue_by_day = [((epoch + datetime.timedelta(days=day)).isoformat(), round(float(totals.day_revenue[day]), 2))
+                          for day in np.flatnonzero(totals.day_revenue).tolist()]
+
+        heatmaps = {}
+        for screen_id, name, layout in conn.execute("SELECT id, name, layout FROM screens ORDER BY id"):
+            counts = totals.seat_counts.get(screen_id)
+            if counts is None:
+                continue
+            rows = seatmap.seat_index(layout).rows
+            heatmaps[screen_id] = {
+                'name': name,
+                'rows': [[int(counts[r, c]) if seat is not None else None for c, seat in enumerate(row)]
+                         for r, row in enumerate(rows)],
+            }
+
+        return {
+            'movies': movies,
+            'revenue_by_hour': [round(float(revenue), 2) for revenue in totals.hour_revenue],
+            'revenue_by_day': revenue_by_day,
+            'seat_heatmaps': heatmaps,
+            'bookings': totals.bookings,
+        }
@@ -0,0 +1,165 @@
+import tkinter as tk
+from tkinter import ttk
+import venues
+
+# Movie table columns: key in the report, heading and width in pixels
+COLUMNS = [
+    ('title', "Movie", 200),
+    ('bookings', "Bookings", 80),
+    ('tickets', "Tickets", 80),
+    ('capacity', "Seats", 80),
+    ('occupancy', "Occupancy", 90),
+    ('revenue', "Revenue", 100),
+]
+
+# Days of revenue shown, ending with the latest day that had bookings
+REVENUE_DAYS_SHOWN = 30
+
+CHART_WIDTH = 640
+CHART_HEIGHT = 150
+HEATMAP_CELL = 14
+
+# Heatmap colours from never sold to the most sold seat of the screen
+HEATMAP_COLD = (235, 240, 250)
+HEATMAP_HOT = (200, 30, 30)
+
+
+def load_report():
+    # Chain-wide in chain mode, like the sales figures above the panel.
+    # NumPy is only imported once the dashboard asks for a report.
+    return venues.dashboard_report()
+
+
+class AnalyticsPanel(ttk.Frame):
+    # Occupancy per movie, revenue by hour of day and by day, and how often
+    # each seat of a screen is sold, computed on the background worker by
+    # analytics.py. Each view is one widget refreshed in place. Without
+    # NumPy the movie table falls back to the booking counts of the sales
+    # summary.
+    def __init__(self, parent, worker):
+        super().__init__(parent)
+        self.worker = worker
+        self.heatmaps = {}
+        self.purchases = []
+        self.unavailable = False
+        self._generation = 0
+
+        self.status_label = ttk.Label(self, text="Loading reports...")
+        self.status_label.pack(anchor="w", pady=5)
+
+        notebook = ttk.Notebook(self)
+        notebook.pack(fill=tk.BOTH, expand=True)
+
+        # Movies
+        movies_tab = ttk.Frame(notebook)
+        notebook.add(movies_tab, text="Movies")
+        self.tree = ttk.Treeview(movies_tab, columns=[key for key, _, _ in COLUMNS], show='headings', height=10)
+        for key, heading, width in COLUMNS:
+            self.tree.heading(key, text=heading)
+            self.tree.column(key, width=width, anchor="w" if key == 'title' else "e")
+        scrollbar = ttk.Scrollbar(movies_tab, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # Revenue
+        revenue_tab = ttk.Frame(notebook)
+        notebook.add(revenue_tab, text="Revenue")
+        ttk.Label(revenue_tab, text="Revenue by hour of booking").pack(anchor="w")
+        self.hour_chart = tk.Canvas(revenue_tab, width=CHART_WIDTH, height=CHART_HEIGHT, bg="white")
+        self.hour_chart.pack(pady=5)
+        ttk.Label(revenue_tab, text=f"Revenue by day (last {REVENUE_DAYS_SHOWN} days with bookings)").pack(anchor="w")
+        self.day_chart = tk.Canvas(revenue_tab, width=CHART_WIDTH, height=CHART_HEIGHT, bg="white")
+        self.day_chart.pack(pady=5)
+
+        # Seats
+        seats_tab = ttk.Frame(notebook)
+        notebook.add(seats_tab, text="Seats")
+        ttk.Label(seats_tab, text="Screen:").pack(anchor="w")
+        self.screen_box = ttk.Combobox(seats_tab, state='readonly', width=30)
+        self.screen_box.pack(anchor="w", pady=5)
+        self.screen_box.bind("<<ComboboxSelected>>", lambda e: self._draw_heatmap())
+        self.heatmap = tk.Canvas(seats_tab, width=CHART_WIDTH, height=CHART_HEIGHT * 2, bg="white")
+        self.heatmap.pack(pady=5)
+
+    def refresh(self):
+        self._generation += 1
+        generation = self._generation
+        self.worker.submit(load_report,
+                           on_done=lambda report: self._show_report(generation, report),
+                           on_error=lambda e: self._report_failed(generation, e),
+                           owner=self)
+
+    def show_purchases(self, purchases):
+        # Booking counts per title from the sales summary, shown while
+        # analytics are unavailable
+        self.purchases = purchases
+        if self.unavailable:
+            self._fill_table([{'title': title, 'bookings': count} for title, count in purchases])
+
+    def _report_failed(self, generation, error):
+        if generation != self._generation:
+            return
+        if isinstance(error, ImportError):
+            self.unavailable = True
+            self.status_label.configure(text="Install NumPy for occupancy, revenue and seat reports.")
+            self.show_purchases(self.purchases)
+        else:
+            self.status_label.configure(text=f"Could not load reports: {error}")
+
+    def _show_report(self, generation, report):
+        if generation != self._generation:
+            return
+        self.unavailable = False
+        self.status_label.configure(text=f"{report['bookings']} bookings")
+        self._fill_table(report['movies'])
+        self._draw_bars(self.hour_chart, [(f"{hour}", revenue) for hour, revenue in enumerate(report['revenue_by_hour'])])
+        self._draw_bars(self.day_chart, [(day[5:], revenue) for day, revenue in report['revenue_by_day'][-REVENUE_DAYS_SHOWN:]])
+
+        self.heatmaps = {f"{screen_id}: {heatmap['name']}": heatmap['rows']
+                         for screen_id, heatmap in report['seat_heatmaps'].items()}
+        names = list(self.heatmaps)
+        self.screen_box.configure(values=names)
+        if self.screen_box.get() not in self.heatmaps:
+            self.screen_box.set(names[0] if names else "")
+        self._draw_heatmap()
+
+    def _fill_table(self, movies):
+        self.tree.delete(*self.tree.get_children())
+        for movie in movies:
+            occupancy = movie.get('occupancy')
+            revenue = movie.get('revenue')
+            self.tree.insert('', tk.END, values=(
+                movie['title'], movie.get('bookings', ''), movie.get('tickets', ''), movie.get('capacity', ''),
+                f"{occupancy:.0%}" if occupancy is not None else "",
+                f"${revenue:,.2f}" if revenue is not None else ""))
+
+    def _draw_bars(self, canvas, bars):
+        # One bar per (label, value), scaled to the largest value
+        canvas.delete("all")
+        if not bars:
+            return
+        top = max(value for _, value in bars) or 1
+        width = CHART_WIDTH / len(bars)
+        base = CHART_HEIGHT - 15
+        for i, (label, value) in enumerate(bars):
+            x = i * width
+            canvas.create_rectangle(x + 2, base - (base - 10) * value / top, x + width - 2, base, fill="steelblue", outline="")
+            canvas.create_text(x + width / 2, base + 8, text=label, font=('Arial', 7))
+
+    def _draw_heatmap(self):
+        self.heatmap.delete("all")
+        rows = self.heatmaps.get(self.screen_box.get())
+        if not rows:
+            return
+        self.heatmap.configure(width=max(len(row) for row in rows) * HEATMAP_CELL, height=len(rows) * HEATMAP_CELL)
+        top = max((count for row in rows for count in row if count), default=0) or 1
+        for r, row in enumerate(rows):
+            for c, count in enumerate(row):
+                if count is None:
+                    continue  # Aisle
+                share = count / top
+                colour = '#%02x%02x%02x' % tuple(round(cold + (hot - cold) * share)
+                                                 for cold, hot in zip(HEATMAP_COLD, HEATMAP_HOT))
+                x, y = c * HEATMAP_CELL, r * HEATMAP_CELL
+                self.heatmap.create_rectangle(x, y, x + HEATMAP_CELL - 1, y + HEATMAP_CELL - 1, fill=colour, outline="")
@@ -0,0 +1,360 @@
+import argparse
+import asyncio
+import base64
+import json
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+import database
+import booking_service
+import metrics
+from booking_writer import GroupCommitWriter, GROUP_COMMIT_MAX_BATCH, GROUP_COMMIT_MAX_DELAY
+from booking_service import BookingError, SeatUnavailableError
+import venues
+
+# JSON API over the same database the Tk app uses, for booking terminals
+# that are not running the desktop client.
+#
+#   GET  /movies?offset=0&limit=20   movie list (&q=search words&genre=drama&language=english)
+#   GET  /facets/genre|language      facet values with movie counts
+#   GET  /movies/<id>/showings       showings of a movie
+#   GET  /posters/<hash>             poster image (?variant=small), cacheable forever
+#   GET  /showings/<id>/seats        seat map for a showing (?hold_token=...&compact=1)
+#   POST /holds                      {"showing_id", "seats", "hold_token"?}
+#   POST /holds/release              {"showing_id", "seats", "hold_token"}
+#   POST /holds/best                 {"showing_id", "count", "hold_token"?} holds the best seats together
+#   POST /bookings                   {"showing_id", "name", "phone", "email", "seats", "hold_token"?}
+#   POST /bookings/<id>/cancel       cancel a booking and free its seats (admin only: HTTP Basic
+#                                    auth with the admin login of the desktop app)
+#   GET  /sales                      sales totals and tickets sold per movie
+#   GET  /metrics                    request and database timings, Prometheus text format
+#
+# Started with --venues DIR the server covers a whole chain with one
+# database per venue (see venues.py): the booking routes above move under
+# /venues/<venue>/ (e.g. POST /venues/downtown/bookings), GET /venues lists
+# the venues and GET /sales adds up the figures of every venue.
+#
+# Reads run on a thread pool. Holds and bookings go through a bounded queue
+# drained by a single group-commit writer (see booking_writer.py), so
+# concurrent clients never fight over the SQLite write lock and a rush of
+# bookings is committed in batches (one writer per venue in chain mode, so
+# venues commit in parallel); when the queue is full the server answers
+# 503 instead of piling up work. Expired holds are swept every
+# HOLD_SWEEP_INTERVAL seconds, when the booking journal is also snapshotted
+# if it has grown enough (see journal.py).
+
+WRITER_QUEUE_SIZE = 256
+READER_THREADS = 8
+MAX_BODY_SIZE = 64 * 1024
+HOLD_SWEEP_INTERVAL = 30
+
+# First path segments timed separately in the metrics; anything else is 'other'
+ROUTES = ('movies', 'facets', 'posters', 'showings', 'holds', 'bookings', 'sales', 'metrics', 'venues')
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class BookingAPI:
+    def __init__(self, db=None, queue_size=WRITER_QUEUE_SIZE, reader_threads=READER_THREADS,
+                 batch_size=GROUP_COMMIT_MAX_BATCH, batch_delay=GROUP_COMMIT_MAX_DELAY, router=None):
+        self.router = router
+        self.db = None if router else db or database.get_db()
+        self.readers = ThreadPoolExecutor(max_workers=reader_threads, thread_name_prefix='api-reader')
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.writers = {}  # Database path -> its GroupCommitWriter
+        self._tasks = []
+
+    async def start(self, host, port):
+        self._tasks = [asyncio.create_task(self._sweep_holds())]
+        return await asyncio.start_server(self._handle_client, host, port)
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self.readers.shutdown(wait=False)
+        for writer in self.writers.values():
+            writer.close()
+        if self.router:
+            self.router.close()
+
+    # Writer
+
+    def writer_for(self, db):
+        # Writers are started on first use; only the event loop thread gets here
+        writer = self.writers.get(db.path)
+        if writer is None:
+            writer = self.writers[db.path] = GroupCommitWriter(db, self.batch_size, self.batch_delay)
+        return writer
+
+    async def submit_write(self, db, func):
+        writer = self.writer_for(db)
+        if writer.pending() >= self.queue_size:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Booking queue is full, try again shortly")
+        return await asyncio.wrap_future(writer.submit(func))
+
+    async def _sweep_holds(self):
+        while True:
+            await asyncio.sleep(HOLD_SWEEP_INTERVAL)
+            # Venues nobody has written to since the start have no holds
+            dbs = [writer.db for writer in self.writers.values()] if self.router else [self.db]
+            for db in dbs:
+                try:
+                    await self.submit_write(db, lambda db=db: booking_service.sweep_expired_holds(db=db))
+                    await self.submit_write(db, lambda db=db: db.snapshot_journal(only_if_due=True))
+                except HTTPError:
+                    pass  # Writer is busy; the next sweep will catch up
+
+    # Routes
+
+    async def route(self, method, path, query, body, headers=None):
+        loop = asyncio.get_running_loop()
+        parts = [part for part in path.split('/') if part]
+
+        if method == 'GET' and parts == ['metrics']:
+            return metrics.to_prometheus()
+
+        if method == 'GET' and parts == ['sales']:
+            if self.router:
+                return await loop.run_in_executor(self.readers, self.router.sales_summary)
+            return await loop.run_in_executor(self.readers, lambda: booking_service.sales_summary(db=self.db))
+
+        db = self.db
+        if self.router:
+            if method == 'GET' and parts == ['venues']:
+                return self.router.venues()
+            if len(parts) < 3 or parts[0] != 'venues':
+                raise HTTPError(HTTPStatus.NOT_FOUND, "Not found")
+            try:
+                db = self.router.db(parts[1])
+            except BookingError as e:
+                raise HTTPError(HTTPStatus.NOT_FOUND, str(e))
+            parts = parts[2:]
+
+        if method == 'GET' and parts == ['movies']:
+            offset = int(query.get('offset', ['0'])[0])
+            limit = int(query.get('limit', ['-1'])[0])
+            search, genre, language = (query.get(name, [None])[0] for name in ('q', 'genre', 'language'))
+            return await loop.run_in_executor(self.readers, lambda: booking_service.list_movies(
+                offset, limit, search, genre, language, db=db))
+
+        if method == 'GET' and len(parts) == 2 and parts[0] == 'facets' and parts[1] in ('genre', 'language'):
+            kind = parts[1]
+            return await loop.run_in_executor(self.readers, lambda: booking_service.list_facets(kind, db=db))
+
+        if method == 'GET' and len(parts) == 3 and parts[0] == 'movies' and parts[2] == 'showings':
+            movie_id = int(parts[1])
+            return await loop.run_in_executor(self.readers, lambda: booking_service.list_showings(movie_id, db=db))
+
+        if method == 'GET' and len(parts) == 3 and parts[0] == 'showings' and parts[2] == 'seats':
+            showing_id = int(parts[1])
+            hold_token = query.get('hold_token', [None])[0]
+            compact = query.get('compact', ['0'])[0] not in ('', '0', 'false')
+            return await loop.run_in_executor(self.readers, lambda: booking_service.get_seat_map(
+                showing_id, hold_token, compact=compact, db=db))
+
+        if method == 'GET' and len(parts) == 2 and parts[0] == 'posters':
+            poster_hash = parts[1]
+            variant = query.get('variant', [database.CARD_VARIANT])[0]
+            data = await loop.run_in_executor(self.readers, lambda: booking_service.get_poster(poster_hash, variant, db=db))
+            if data is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "Poster not found")
+            return data
+
+        if method == 'POST' and parts == ['holds']:
+            request = self._parse_body(body, ('showing_id', 'seats'))
+            return await self.submit_write(db, lambda: booking_service.reserve_seats(
+                request['showing_id'], request['seats'], request.get('hold_token'), db=db))
+
+        if method == 'POST' and parts == ['holds', 'release']:
+            request = self._parse_body(body, ('showing_id', 'seats', 'hold_token'))
+            await self.submit_write(db, lambda: booking_service.release_seats(
+                request['showing_id'], request['seats'], request['hold_token'], db=db))
+            return {'released': request['seats']}
+
+        if method == 'POST' and parts == ['holds', 'best']:
+            request = self._parse_body(body, ('showing_id', 'count'))
+            if isinstance(request['count'], bool) or not isinstance(request['count'], int):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "count must be a number")
+            return await self.submit_write(db, lambda: booking_service.reserve_best_available(
+                request['showing_id'], request['count'], request.get('hold_token'), db=db))
+
+        if method == 'POST' and parts == ['bookings']:
+            request = self._parse_body(body, ('showing_id', 'name', 'phone', 'seats'))
+            return await self.submit_write(db, lambda: booking_service.confirm_booking(
+                request['showing_id'], request['name'], request['phone'], request.get('email', ''),
+                request['seats'], hold_token=request.get('hold_token'), db=db))
+
+        if method == 'POST' and len(parts) == 3 and parts[0] == 'bookings' and parts[2] == 'cancel':
+            await self._require_admin(db, headers or {})
+            booking_id = int(parts[1])
+            return await self.submit_write(db, lambda: booking_service.cancel_booking(booking_id, db=db))
+
+        raise HTTPError(HTTPStatus.NOT_FOUND, "Not found")
+
+    async def _require_admin(self, db, headers):
+        # Admin-only routes take the desktop app's admin login as HTTP Basic auth
+        scheme, _, encoded = headers.get('authorization', '').partition(' ')
+        try:
+            username, _, password = base64.b64decode(encoded, validate=True).decode('utf-8').partition(':')
+        except ValueError:  # Includes bad base64 and bad UTF-8
+            username = password = ''
+        loop = asyncio.get_running_loop()
+        if (scheme.lower() != 'basic' or not username
+                or not await loop.run_in_executor(self.readers, lambda: booking_service.authenticate_admin(
+                    username, password, db=db))):
+            raise HTTPError(HTTPStatus.UNAUTHORIZED, "Admin credentials required")
+
+    def _parse_body(self, body, required):
+        request = json.loads(body or b'{}')
+        if not isinstance(request, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+        missing = [field for field in required if field not in request]
+        if missing:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Missing fields: {', '.join(missing)}")
+        # bool is an int to isinstance, but true is not a showing or a count
+        if 'showing_id' in required and (isinstance(request['showing_id'], bool)
+                                         or not isinstance(request['showing_id'], int)):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "showing_id must be a number")
+        if 'seats' in required and not (isinstance(request['seats'], list)
+                                        and all(isinstance(seat, str) for seat in request['seats'])):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "seats must be a list of seat ids")
+        for field in ('name', 'phone', 'email', 'hold_token'):
+            if request.get(field) is not None and not isinstance(request[field], str):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"{field} must be a string")
+        return request
+
+    # HTTP plumbing
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {'error': "Malformed request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                try:
+                    length = int(headers.get('content-length') or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # Where the body ends is unknown, so the connection cannot go on
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {'error': "Invalid Content-Length"}, False)
+                    break
+                if length > MAX_BODY_SIZE:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': "Request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                url = urlsplit(target)
+                root = url.path.strip('/').split('/')[0]
+                start = time.perf_counter()
+                try:
+                    result = await self.route(method, url.path, parse_qs(url.query), body, headers)
+                    status = HTTPStatus.CREATED if method == 'POST' else HTTPStatus.OK
+                except HTTPError as e:
+                    status, result = e.status, {'error': e.message}
+                except SeatUnavailableError as e:
+                    status, result = HTTPStatus.CONFLICT, {'error': str(e), 'seats': e.seats}
+                except BookingError as e:
+                    status, result = HTTPStatus.BAD_REQUEST, {'error': str(e)}
+                except (ValueError, KeyError, TypeError) as e:
+                    status, result = HTTPStatus.BAD_REQUEST, {'error': f"Invalid request: {e}"}
+                except Exception:
+                    # The details go to the server's log, not to the client
+                    print(f"Error handling {method} {url.path}:", file=sys.stderr)
+                    traceback.print_exc()
+                    status, result = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Internal server error"}
+                metrics.observe(f"api.{method} /{root if root in ROUTES else 'other'}", time.perf_counter() - start)
+
+                await self._respond(writer, status, result, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        headers = ""
+        if isinstance(payload, str):
+            body, content_type = payload.encode('utf-8'), "text/plain; version=0.0.4"
+        elif isinstance(payload, bytes):
+            # Posters are addressed by content hash, so they never change
+            body, content_type = payload, "image/png"
+            headers = "Cache-Control: public, max-age=31536000, immutable\r\n"
+        else:
+            body, content_type = json.dumps(payload).encode('utf-8'), "application/json"
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"{headers}"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(host, port, db=None, batch_size=GROUP_COMMIT_MAX_BATCH, batch_delay=GROUP_COMMIT_MAX_DELAY,
+                router=None):
+    api = BookingAPI(db, batch_size=batch_size, batch_delay=batch_delay, router=router)
+    server = await api.start(host, port)
+    print(f"Booking API listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await api.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Movie booking JSON API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--db', default=database.DEFAULT_DB_PATH, help="SQLite database file")
+    parser.add_argument('--venues', default=venues.VENUES_DIR,
+                        help="directory of per-venue databases; serves every venue in it")
+    parser.add_argument('--batch-size', type=int, default=GROUP_COMMIT_MAX_BATCH,
+                        help="bookings and holds committed together at most")
+    parser.add_argument('--batch-delay-ms', type=float, default=GROUP_COMMIT_MAX_DELAY * 1000,
+                        help="how long a booking waits for others to share its commit")
+    args = parser.parse_args()
+
+    metrics.enable_from_environment()
+    db = router = None
+    if args.venues:
+        router = venues.VenueRouter(args.venues)
+        router.setup()
+    else:
+        db = database.configure(args.db)
+        db.setup()
+    try:
+        asyncio.run(serve(args.host, args.port, db, args.batch_size, args.batch_delay_ms / 1000, router))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,684 @@
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import booking_service
+import database
+import journal
+import migrations
+import seatmap
+import venues
+from booking_writer import GroupCommitWriter
+from booking_service import BookingError, SeatUnavailableError
+
+# Benchmarks for the booking hot paths.
+#
+#   python benchmark.py best-available [--rows 80] [--seats-per-row 120] [--fill 0.85]
+#   python benchmark.py booking-path [--db FILE] [--movies 2000] [--showings 5] [--writers 4]
+#   python benchmark.py startup [--db FILE] [--runs 10]
+#   python benchmark.py venues [--dir DIR] [--venues 4] [--writers 8]
+#   python benchmark.py analytics [--db FILE] [--movies 10000] [--fill 0.8]
+#   python benchmark.py plans [--movies 200]
+#
+# Every command takes --json FILE to save its results and --compare FILE to
+# check them against a saved run: a timing more than --tolerance slower (or a
+# throughput that much lower) than the baseline is reported as a regression
+# and the command exits with status 1, so a release can be checked against
+# the previous one's results.
+
+# Words the synthetic catalog's titles and descriptions are made of
+WORDS = ['night', 'city', 'river', 'last', 'empire', 'shadow', 'summer', 'storm', 'silent', 'golden',
+         'return', 'king', 'garden', 'winter', 'secret', 'road', 'fire', 'ocean', 'star', 'dream']
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Drama', 'Horror', 'Romance',
+          'Sci-Fi', 'Thriller']
+LANGUAGES = ['English', 'Korean', 'French', 'Hindi', 'Spanish', 'Japanese']
+
+# Movies and showings written per seeding transaction
+SEED_BATCH_SIZE = 500
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def large_layout(rows, seats_per_row, aisles=2):
+    # A wide auditorium: each row split into aisles + 1 blocks by gaps
+    block, rest = divmod(seats_per_row, aisles + 1)
+    blocks = [block] * (aisles + 1)
+    blocks[aisles // 2] += rest
+    line = '.'.join('S' * size for size in blocks)
+    return '\n'.join([line] * rows)
+
+
+def random_bitmap(index, fill, rng):
+    bitmap = seatmap.SeatBitmap(len(index))
+    bitmap.set(i for i in range(len(index)) if rng.random() < fill)
+    return bitmap
+
+
+def brute_force_score(index, bitmap, n):
+    # Reference answer: score every block of n free seats one by one
+    centre_col = (index.width - 1) / 2
+    centre_row = (len(index.rows) - 1) / 2
+    best = None
+    for row, runs in enumerate(index.segments):
+        dy = (row - centre_row) * seatmap.ROW_WEIGHT
+        for seg_start, seg_length, seg_col in runs:
+            for first in range(seg_start, seg_start + seg_length - n + 1):
+                if bitmap.all_free(range(first, first + n)):
+                    dx = seg_col + first - seg_start + (n - 1) / 2 - centre_col
+                    score = dx * dx + dy * dy
+                    if best is None or score < best:
+                        best = score
+    return best
+
+
+def block_score(index, positions):
+    row = col = None
+    for r, runs in enumerate(index.segments):
+        for seg_start, seg_length, seg_col in runs:
+            if seg_start <= positions[0] < seg_start + seg_length:
+                row, col = r, seg_col + positions[0] - seg_start
+    dx = col + (len(positions) - 1) / 2 - (index.width - 1) / 2
+    dy = (row - (len(index.rows) - 1) / 2) * seatmap.ROW_WEIGHT
+    return dx * dx + dy * dy
+
+
+def bench_best_available(args):
+    rng = random.Random(args.seed)
+    index = seatmap.SeatIndex(large_layout(args.rows, args.seats_per_row))
+    bitmaps = [random_bitmap(index, args.fill, rng) for _ in range(8)]
+    print(f"{len(index)} seats in {len(index.rows)} rows, {args.fill:.0%} sold, "
+          f"{len(bitmaps[0].to_bytes())} byte bitmap")
+
+    # The fast path must find a block as good as checking every block
+    for bitmap in bitmaps:
+        for n in args.sizes:
+            expected = brute_force_score(index, bitmap, n)
+            found = bitmap.best_available(index, n)
+            actual = None if found is None else block_score(index, found)
+            if expected != actual:
+                raise BenchmarkError(f"Mismatch for {n} seats: expected score {expected}, got {actual}")
+
+    results = {}
+    for n in args.sizes:
+        start = time.perf_counter()
+        for i in range(args.repeat):
+            bitmaps[i % len(bitmaps)].best_available(index, n)
+        elapsed = time.perf_counter() - start
+        results[f'best_{n}_seats_us'] = elapsed / args.repeat * 1e6
+        print(f"best {n:>3} seats: {results[f'best_{n}_seats_us']:9.1f} us per call")
+    return results
+
+
+# Booking path
+
+def synthetic_movie(rng, number, total_seats, start_times):
+    title = f"{' '.join(rng.sample(WORDS, 2)).title()} {number}"
+    description = ' '.join(rng.choice(WORDS) for _ in range(30))
+    genre = ', '.join(rng.sample(GENRES, rng.randint(1, 3)))
+    release_date = (datetime.date(2000, 1, 1) + datetime.timedelta(days=rng.randrange(9000))).isoformat()
+    return [title, description, rng.choice(LANGUAGES), f"{rng.randint(1, 3)}h {rng.randrange(60)}m",
+            release_date, genre, total_seats, round(rng.uniform(6, 18), 2), None, start_times]
+
+
+def seed_bookings(db, rng, showing_ids, fill, days):
+    # Sells about `fill` of each showing's seats in bookings of 1-4 seats
+    # dated over the last `days` days. Rows are written directly with
+    # executemany (the sales triggers still fire, and each booking gets its
+    # journal event) instead of one confirm_booking per booking, which
+    # would take hours for millions.
+    now = datetime.datetime.now()
+    with db.transaction(immediate=True) as conn:
+        booking_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM bookings").fetchone()[0]
+        bookings, inventory, events, showings, movies = [], [], [], [], {}
+        for showing_id, movie_id, layout, price in conn.execute(f'''
+                SELECT s.id, s.movie_id, c.layout, m.price
+                FROM showings s JOIN screens c ON c.id = s.screen_id JOIN movies m ON m.id = s.movie_id
+                WHERE s.id IN ({','.join('?' * len(showing_ids))})''', showing_ids).fetchall():
+            index = seatmap.seat_index(layout)
+            bitmap = seatmap.SeatBitmap(len(index))
+            target = int(len(index) * fill)
+            first = 0
+            while first < target:
+                n = min(rng.randint(1, 4), target - first)
+                seats = index.seat_ids[first:first + n]
+                booking_id += 1
+                booked_at = now - datetime.timedelta(seconds=rng.randrange(days * 86400))
+                bookings.append((booking_id, movie_id, showing_id, f"Customer {booking_id}",
+                                 f"555{booking_id % 10000000:07d}", f"customer{booking_id}@example.com",
+                                 ','.join(seats), n * price, booked_at.strftime("%Y-%m-%d %H:%M:%S")))
+                inventory.extend((showing_id, seat_id, booking_id) for seat_id in seats)
+                events.append((journal.CONFIRMED, showing_id, movie_id, booking_id, None, seats, n * price))
+                first += n
+            bitmap.set(range(target))
+            showings.append((target, bitmap.to_bytes(), showing_id))
+            movies[movie_id] = movies.get(movie_id, 0) + target
+
+        conn.executemany('''
+            INSERT INTO bookings (id, movie_id, showing_id, customer_name, phone, email, seats, total_amount, booking_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', bookings)
+        conn.executemany("INSERT INTO seat_inventory (showing_id, seat_id, status, booking_id) VALUES (?, ?, 'booked', ?)",
+                         inventory)
+        conn.executemany("UPDATE showings SET available_seats = available_seats - ?, seat_bitmap = ? WHERE id = ?",
+                         showings)
+        conn.executemany("UPDATE movies SET available_seats = available_seats - ? WHERE id = ?",
+                         [(sold, movie_id) for movie_id, sold in movies.items()])
+        journal.append(conn.cursor(), events)
+    return len(bookings)
+
+
+def seed_catalog(db, args):
+    # Adds args.movies synthetic movies with args.showings showings each and
+    # sells args.fill of every showing
+    rng = random.Random(args.seed)
+    start = datetime.datetime.now().replace(minute=0, second=0, microsecond=0)
+    movies = bookings = 0
+    while movies < args.movies:
+        batch = []
+        for number in range(movies, min(movies + SEED_BATCH_SIZE, args.movies)):
+            start_times = [(start + datetime.timedelta(days=rng.randrange(30), hours=rng.randrange(10, 23)))
+                           .strftime(booking_service.START_TIME_FORMAT) for _ in range(args.showings)]
+            batch.append(synthetic_movie(rng, number + 1, args.seats, start_times))
+        movie_ids = db.insert_movies(batch)
+        marks = ','.join('?' * len(movie_ids))
+        showing_ids = [showing_id for showing_id, in db.execute(
+            f"SELECT id FROM showings WHERE movie_id IN ({marks})", movie_ids)]
+        bookings += seed_bookings(db, rng, showing_ids, args.fill, args.days)
+        movies += len(batch)
+        print(f"Seeded {movies} movies, {bookings} bookings", file=sys.stderr)
+    db.execute("ANALYZE")
+
+
+def timings(func, repeat):
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(name, samples, results):
+    # Adds median, 95th percentile and worst time in milliseconds
+    samples = sorted(samples)
+    results[f'{name}_p50_ms'] = statistics.median(samples) * 1000
+    results[f'{name}_p95_ms'] = samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000
+    results[f'{name}_max_ms'] = samples[-1] * 1000
+    print(f"{name:<12} p50 {results[f'{name}_p50_ms']:8.2f} ms   p95 {results[f'{name}_p95_ms']:8.2f} ms   "
+          f"max {results[f'{name}_max_ms']:8.2f} ms")
+
+
+def run_writers(db, showing_ids, writers, per_writer, seed, group_commit=None):
+    # `writers` threads each confirm `per_writer` bookings of 1-4 seats,
+    # picking the best available seats of random showings like a kiosk
+    # would. Seats taken by another writer in between are a conflict and
+    # the writer picks again. With a GroupCommitWriter the confirmations go
+    # through it, as they do in the API. Returns (latencies, conflicts, elapsed).
+    latencies, conflicts = [], []
+    lock = threading.Lock()
+
+    def writer(number):
+        rng = random.Random(seed + number)
+        mine, clashes = [], 0
+        while len(mine) < per_writer:
+            showing_id = rng.choice(showing_ids)
+            start = time.perf_counter()
+            seats = booking_service.best_available_seats(showing_id, rng.randint(1, 4), db=db)
+            if seats is None:
+                continue
+            try:
+                if group_commit:
+                    group_commit.submit(booking_service.confirm_booking, showing_id, f"Writer {number}",
+                                        "5550000000", "", seats, None, None, db).result()
+                else:
+                    booking_service.confirm_booking(showing_id, f"Writer {number}", "5550000000", "", seats, db=db)
+            except SeatUnavailableError:
+                clashes += 1
+                continue
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+            conflicts.append(clashes)
+
+    threads = [threading.Thread(target=writer, args=(number,)) for number in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(conflicts), time.perf_counter() - start
+
+
+def bench_booking_path(args):
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='movie-bench-'), 'bench.db')
+    db = database.Database(path)
+    db.setup()
+    booking_service.clear_layout_cache()
+    if booking_service.count_movies(db=db) < args.movies:
+        print(f"Seeding {path}", file=sys.stderr)
+        start = time.perf_counter()
+        seed_catalog(db, args)
+        print(f"Seeded in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+    rng = random.Random(args.seed)
+    movie_count = booking_service.count_movies(db=db)
+    booking_count = db.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+    showing_ids = [showing_id for showing_id, in db.execute("SELECT id FROM showings")]
+    print(f"{movie_count} movies, {len(showing_ids)} showings, {booking_count} bookings")
+    results = {'movies': movie_count, 'showings': len(showing_ids), 'bookings': booking_count}
+
+    # Home grid: the count for the scrollbar and one page of cards
+    def home_grid(i):
+        booking_service.count_movies(db=db)
+        booking_service.list_movies(rng.randrange(max(movie_count - args.page_size, 1)), args.page_size, db=db)
+    summarize('home_grid', timings(home_grid, args.repeat), results)
+
+    # Search box with a genre filter
+    def search(i):
+        booking_service.count_movies(rng.choice(WORDS), genre=rng.choice(GENRES), db=db)
+        booking_service.list_movies(0, args.page_size, rng.choice(WORDS), genre=rng.choice(GENRES), db=db)
+    summarize('search', timings(search, args.repeat), results)
+
+    summarize('seat_map', timings(lambda i: booking_service.get_seat_map(rng.choice(showing_ids), db=db),
+                                  args.repeat), results)
+
+    # Admin dashboard: sales figures and the first page of bookings
+    def dashboard(i):
+        booking_service.sales_summary(db=db)
+        booking_service.search_bookings(db=db)
+    summarize('dashboard', timings(dashboard, args.repeat), results)
+
+    # The same booking rush with each writer committing on its own, then
+    # through the group-commit writer the API uses
+    group_commit = GroupCommitWriter(db)
+    for name, writer in (('confirm', None), ('group_confirm', group_commit)):
+        latencies, conflicts, elapsed = run_writers(db, showing_ids, args.writers, args.bookings_per_writer,
+                                                    args.seed, writer)
+        summarize(name, latencies, results)
+        results[f'{name}_per_s'] = len(latencies) / elapsed
+        results[f'{name}_conflicts'] = conflicts
+        print(f"{name:<12} {results[f'{name}_per_s']:8.1f} bookings/s with {args.writers} writers, "
+              f"{conflicts} conflicts")
+    group_commit.close()
+    db.close()
+    return results
+
+
+# Analytics
+
+# The bookings analytics.py counts, one row each, for the plain Python totals
+BOOKING_ROWS_SQL = '''
+    SELECT COALESCE(movie_id, 0), COALESCE(showing_id, 0), COALESCE(seats, ''), COALESCE(total_amount, 0), booking_date
+    FROM bookings WHERE cancelled_at IS NULL
+'''
+
+
+def python_totals(db):
+    # The analytics totals added up row by row in plain Python, the way the
+    # dashboard would without NumPy: per movie bookings, tickets and
+    # revenue, revenue per hour of day and per day (days since 1970), and
+    # tickets per (screen, seat) for seats in the screen's layout
+    screen_of = dict(db.execute("SELECT id, screen_id FROM showings"))
+    layouts = {screen_id: seatmap.seat_index(layout) for screen_id, layout in db.execute("SELECT id, layout FROM screens")}
+    epoch = datetime.date(1970, 1, 1).toordinal()
+    totals = {'movie_bookings': {}, 'movie_tickets': {}, 'movie_revenue': {},
+              'hour_revenue': {}, 'day_revenue': {}, 'seats': {}}
+    movie_bookings, movie_tickets, movie_revenue, hour_revenue, day_revenue, seats = totals.values()
+    for movie_id, showing_id, seat_list, amount, booking_date in db.execute(BOOKING_ROWS_SQL):
+        booked = seat_list.split(',') if seat_list else []
+        movie_bookings[movie_id] = movie_bookings.get(movie_id, 0) + 1
+        movie_tickets[movie_id] = movie_tickets.get(movie_id, 0) + len(booked)
+        movie_revenue[movie_id] = movie_revenue.get(movie_id, 0) + amount
+        if booking_date:
+            hour = int(booking_date[11:13])
+            day = datetime.date.fromisoformat(booking_date[:10]).toordinal() - epoch
+            hour_revenue[hour] = hour_revenue.get(hour, 0) + amount
+            day_revenue[day] = day_revenue.get(day, 0) + amount
+        screen_id = screen_of.get(showing_id)
+        index = layouts.get(screen_id)
+        for seat_id in booked:
+            seat_id = seat_id.strip()
+            if index is not None and seat_id in index:
+                seats[screen_id, seat_id] = seats.get((screen_id, seat_id), 0) + 1
+    return totals
+
+
+def vectorized_totals(totals):
+    # An analytics.BookingTotals in the shape python_totals returns
+    def nonzero(values):
+        return {i: value for i, value in enumerate(values.tolist()) if value}
+    return {
+        'movie_bookings': nonzero(totals.movie_bookings),
+        'movie_tickets': nonzero(totals.movie_tickets),
+        'movie_revenue': nonzero(totals.movie_revenue),
+        'hour_revenue': nonzero(totals.hour_revenue),
+        'day_revenue': nonzero(totals.day_revenue),
+        'seats': {(screen_id, seat_id): int(totals.seat_counts[screen_id][cell])
+                  for (screen_id, seat_id), cell in totals.screen_seats.items() if cell is not None},
+    }
+
+
+def differences(expected, actual):
+    # Names of the totals that differ; money may differ by rounding only
+    def same(a, b):
+        return a.keys() == b.keys() and all(math.isclose(a[key], b[key], abs_tol=0.01) for key in a)
+    return [name for name in expected if not same(expected[name], actual[name])]
+
+
+def bench_analytics(args):
+    # The totals behind the dashboard reports computed from every booking
+    # with NumPy and row by row in plain Python (same rows, same outputs,
+    # checked to agree), then the reports themselves: from scratch, with
+    # nothing new, and after --new-bookings more
+    import analytics
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='movie-bench-'), 'bench.db')
+    db = database.Database(path)
+    db.setup()
+    if booking_service.count_movies(db=db) < args.movies:
+        print(f"Seeding {path}", file=sys.stderr)
+        seed_catalog(db, args)
+    booking_count = db.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+    print(f"{booking_count} bookings")
+    results = {'bookings': booking_count}
+
+    computed = []
+
+    def vectorized(i):
+        totals = analytics.BookingTotals()
+        totals.refresh(db)
+        computed.append(totals)
+    summarize('vectorized_totals', timings(vectorized, args.repeat), results)
+    summarize('python_totals', timings(lambda i: computed.append(python_totals(db)), args.repeat), results)
+    mismatched = differences(computed[-1], vectorized_totals(computed[0]))
+    if mismatched:
+        raise BenchmarkError(f"Vectorized totals differ from the plain Python ones: {', '.join(mismatched)}")
+    print(f"Vectorized totals are {results['python_totals_p50_ms'] / results['vectorized_totals_p50_ms']:.1f}x "
+          f"as fast as plain Python")
+
+    def cold(i):
+        analytics.clear_cache()
+        analytics.dashboard_report(db)
+    summarize('cold_report', timings(cold, args.repeat), results)
+    summarize('warm_report', timings(lambda i: analytics.dashboard_report(db), args.repeat), results)
+
+    rng = random.Random(args.seed)
+    showing_ids = [showing_id for showing_id, in db.execute("SELECT id FROM showings")]
+
+    def incremental(i):
+        added = 0
+        while added < args.new_bookings:
+            showing_id = rng.choice(showing_ids)
+            seats = booking_service.best_available_seats(showing_id, rng.randint(1, 4), db=db)
+            if seats:
+                booking_service.confirm_booking(showing_id, "Analyst", "5550000000", "", seats, db=db)
+                added += 1
+        start = time.perf_counter()
+        analytics.dashboard_report(db)
+        return time.perf_counter() - start
+    summarize('incremental_report', [incremental(i) for i in range(args.repeat)], results)
+
+    # The cached totals kept up with the new bookings
+    mismatched = differences(python_totals(db), vectorized_totals(analytics.booking_totals(db)))
+    if mismatched:
+        raise BenchmarkError(f"Incrementally refreshed totals differ from the plain Python ones: {', '.join(mismatched)}")
+    db.close()
+    return results
+
+
+# Query plans
+
+def bench_plans(args):
+    # migrations.check_query_plans on a newly migrated database, and again
+    # once a small catalog is seeded and analysed, so a schema or query
+    # change that loses an index fails the run (exit status 1)
+    db = database.Database(os.path.join(tempfile.mkdtemp(prefix='movie-bench-'), 'plans.db'))
+    db.setup()
+    failures = [('new database', sql, plan) for sql, plan in migrations.check_query_plans(db.connection())]
+    seed_catalog(db, args)
+    failures += [('seeded database', sql, plan) for sql, plan in migrations.check_query_plans(db.connection())]
+    db.close()
+    for stage, sql, plan in failures:
+        print(f"Index not used on the {stage} by: {' '.join(sql.split())}")
+        for step in plan:
+            print(f"    {step}")
+    if failures:
+        raise BenchmarkError(f"{len(failures)} query plans missed their index")
+    print(f"All {len(migrations.EXPECTED_PLANS)} queries use their indexes")
+    return {'queries': len(migrations.EXPECTED_PLANS)}
+
+
+# Venues
+
+def bench_venues(args):
+    # The same booking rush against one venue database, then spread over
+    # --venues of them (writers split evenly), and the chain-wide dashboard
+    # figures read one venue after another and fanned out
+    router = venues.VenueRouter(args.dir or tempfile.mkdtemp(prefix='movie-bench-'))
+    showing_ids = {}
+    for number in range(args.venues):
+        venue = f'venue{number + 1}'
+        db = router.add_venue(venue)
+        if booking_service.count_movies(db=db) < args.movies:
+            print(f"Seeding {db.path}", file=sys.stderr)
+            seed_catalog(db, args)
+        showing_ids[venue] = [showing_id for showing_id, in db.execute("SELECT id FROM showings")]
+    booking_service.clear_layout_cache()
+
+    results = {'venues': args.venues}
+    for name, count in (('one_venue', 1), ('all_venues', args.venues)):
+        outcomes = []
+        threads = [threading.Thread(target=lambda venue=venue, writers=writers: outcomes.append(run_writers(
+                       router.db(venue), showing_ids[venue], writers, args.bookings_per_writer, args.seed)))
+                   for venue, writers in zip(list(showing_ids)[:count],
+                                             [args.writers // count + (i < args.writers % count) for i in range(count)])
+                   if writers]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        latencies = [latency for outcome in outcomes for latency in outcome[0]]
+        summarize(f'{name}_confirm', latencies, results)
+        results[f'{name}_per_s'] = len(latencies) / elapsed
+        print(f"{name:<12} {results[f'{name}_per_s']:8.1f} bookings/s with {args.writers} writers "
+              f"on {count} venue database(s)")
+
+    def sequential(i):
+        for venue in router.venues():
+            booking_service.sales_summary(db=router.db(venue))
+    summarize('sales_sequential', timings(sequential, args.repeat), results)
+    summarize('sales_fan_out', timings(lambda i: router.sales_summary(), args.repeat), results)
+    router.close()
+    return results
+
+
+# Startup
+
+# Run in a fresh interpreter for every sample: import the app and set up the
+# database, as launching main.py does before the window opens
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import database, main
+imported = time.perf_counter()
+database.configure(sys.argv[1])
+main.setup_database()
+ready = time.perf_counter()
+print(json.dumps({'import': imported - start, 'setup': ready - imported}))
+"""
+
+
+def time_startup(path):
+    # (import, setup, whole process) in seconds for one launch
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, path], check=True, capture_output=True,
+                            text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    elapsed = time.perf_counter() - start
+    sample = json.loads(output)
+    return sample['import'], sample['setup'], elapsed
+
+
+def bench_startup(args):
+    # First launch on a new database, then restarts on the same one (a kiosk
+    # coming back after a crash). Creating the Tk window is not included.
+    workdir = tempfile.mkdtemp(prefix='movie-bench-')
+    first = [time_startup(os.path.join(workdir, f'first{i}.db')) for i in range(args.runs)]
+    path = args.db or os.path.join(workdir, 'restart.db')
+    time_startup(path)
+    restart = [time_startup(path) for _ in range(args.runs)]
+
+    results = {}
+    summarize('first_setup', [setup for _, setup, _ in first], results)
+    summarize('import', [imported for imported, _, _ in restart], results)
+    summarize('setup', [setup for _, setup, _ in restart], results)
+    summarize('restart', [total for _, _, total in restart], results)
+    return results
+
+
+# Results
+
+def compare(results, baseline, tolerance):
+    # Metrics worse than the baseline by more than `tolerance`: timings
+    # (_ms, _us) going up or throughputs (_per_s) going down. Worst-case
+    # times are too noisy to compare and are only reported.
+    regressions = []
+    for name, value in results.items():
+        old = baseline.get(name)
+        if not old or name.endswith('_max_ms'):
+            continue
+        if name.endswith(('_ms', '_us')) and value > old * (1 + tolerance):
+            regressions.append((name, old, value))
+        elif name.endswith('_per_s') and value < old * (1 - tolerance):
+            regressions.append((name, old, value))
+    return regressions
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Seat map micro-benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    best = commands.add_parser('best-available', help="time the best-available seat search")
+    best.add_argument('--rows', type=int, default=80)
+    best.add_argument('--seats-per-row', type=int, default=120)
+    best.add_argument('--fill', type=float, default=0.85, help="share of seats already sold")
+    best.add_argument('--sizes', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    best.add_argument('--repeat', type=int, default=200)
+    best.add_argument('--seed', type=int, default=1)
+    best.set_defaults(func=bench_best_available)
+
+    path = commands.add_parser('booking-path', help="seed a synthetic catalog and time the booking path")
+    path.add_argument('--db', help="database file to seed or reuse (default: a new temporary file)")
+    path.add_argument('--movies', type=int, default=2000)
+    path.add_argument('--showings', type=int, default=5, help="showings per movie")
+    path.add_argument('--seats', type=int, default=100, help="seats per showing")
+    path.add_argument('--fill', type=float, default=0.6, help="share of seats already sold")
+    path.add_argument('--days', type=int, default=365, help="days the seeded bookings are spread over")
+    path.add_argument('--page-size', type=int, default=12, help="movie cards per home grid page")
+    path.add_argument('--repeat', type=int, default=200)
+    path.add_argument('--writers', type=int, default=4, help="concurrent booking threads")
+    path.add_argument('--bookings-per-writer', type=int, default=100)
+    path.add_argument('--seed', type=int, default=1)
+    path.set_defaults(func=bench_booking_path)
+
+    chain = commands.add_parser('venues', help="compare booking throughput on one and on several venue databases")
+    chain.add_argument('--dir', help="venue directory to seed or reuse (default: a new temporary one)")
+    chain.add_argument('--venues', type=int, default=4)
+    chain.add_argument('--movies', type=int, default=200, help="movies per venue")
+    chain.add_argument('--showings', type=int, default=5, help="showings per movie")
+    chain.add_argument('--seats', type=int, default=100, help="seats per showing")
+    chain.add_argument('--fill', type=float, default=0.3, help="share of seats already sold")
+    chain.add_argument('--days', type=int, default=365, help="days the seeded bookings are spread over")
+    chain.add_argument('--writers', type=int, default=8, help="concurrent booking threads in total")
+    chain.add_argument('--bookings-per-writer', type=int, default=100)
+    chain.add_argument('--repeat', type=int, default=50)
+    chain.add_argument('--seed', type=int, default=1)
+    chain.set_defaults(func=bench_venues)
+
+    reports = commands.add_parser('analytics', help="time the dashboard reports over millions of bookings")
+    reports.add_argument('--db', help="database file to seed or reuse (default: a new temporary file)")
+    reports.add_argument('--movies', type=int, default=10000)
+    reports.add_argument('--showings', type=int, default=5, help="showings per movie")
+    reports.add_argument('--seats', type=int, default=100, help="seats per showing")
+    reports.add_argument('--fill', type=float, default=0.8, help="share of seats already sold")
+    reports.add_argument('--days', type=int, default=365, help="days the seeded bookings are spread over")
+    reports.add_argument('--new-bookings', type=int, default=1000, help="bookings added before each incremental refresh")
+    reports.add_argument('--repeat', type=int, default=3)
+    reports.add_argument('--seed', type=int, default=1)
+    reports.set_defaults(func=bench_analytics)
+
+    plans = commands.add_parser('plans', help="check that the hot queries use their indexes on a new database")
+    plans.add_argument('--movies', type=int, default=200)
+    plans.add_argument('--showings', type=int, default=5, help="showings per movie")
+    plans.add_argument('--seats', type=int, default=100, help="seats per showing")
+    plans.add_argument('--fill', type=float, default=0.5, help="share of seats already sold")
+    plans.add_argument('--days', type=int, default=365, help="days the seeded bookings are spread over")
+    plans.add_argument('--seed', type=int, default=1)
+    plans.set_defaults(func=bench_plans)
+
+    startup = commands.add_parser('startup', help="time importing the app and setting up the database")
+    startup.add_argument('--db', help="existing database to time restarts on (default: a new one)")
+    startup.add_argument('--runs', type=int, default=10)
+    startup.set_defaults(func=bench_startup)
+
+    for command in (best, path, chain, reports, plans, startup):
+        command.add_argument('--json', help="write the results to this file")
+        command.add_argument('--compare', help="baseline results file to check for regressions")
+        command.add_argument('--tolerance', type=float, default=0.2,
+                             help="allowed slowdown against the baseline (0.2 = 20%%)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        results = args.func(args)
+    except (BenchmarkError, BookingError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if args.json:
+        params = {name: value for name, value in vars(args).items()
+                  if name not in ('func', 'json', 'compare', 'tolerance')}
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'benchmark': args.command, 'created': datetime.datetime.now().isoformat(timespec='seconds'),
+                       'environment': environment(), 'params': params, 'results': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('benchmark') != args.command:
+            print(f"{args.compare} holds {baseline.get('benchmark')} results, not {args.command}", file=sys.stderr)
+            return 1
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:.2f} -> {new:.2f}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
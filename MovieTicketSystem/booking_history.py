@@ -0,0 +1,153 @@
+import functools
+import tkinter as tk
+from tkinter import ttk, messagebox
+import booking_service
+from booking_service import BookingError
+
+# Table columns: key in the booking dict, heading and width in pixels
+COLUMNS = [
+    ('id', "ID", 60),
+    ('booking_date', "Booked", 140),
+    ('movie', "Movie", 160),
+    ('start_time', "Showing", 120),
+    ('customer_name', "Customer", 130),
+    ('phone', "Phone", 100),
+    ('email', "Email", 160),
+    ('seats', "Seats", 120),
+    ('total_amount', "Amount", 70),
+]
+
+# The next page is requested once the view is scrolled past this point
+LOAD_MORE_AT = 0.9
+
+ALL_MOVIES = "All movies"
+
+
+class BookingHistory(ttk.Frame):
+    # Admin table of bookings, newest first, filtered by movie, date range,
+    # phone or email. Rows are fetched a page at a time (keyset pagination on
+    # booking date and id) on the background worker and appended to the
+    # Treeview as the user scrolls, so opening the screen costs the same
+    # however many bookings exist.
+    def __init__(self, parent, worker):
+        super().__init__(parent)
+        self.worker = worker
+        self.filters = {}
+        self.next_key = None
+        self.loaded = 0
+        self.movie_ids = [None]
+        self._fetching = False
+        self._done = False
+        self._generation = 0  # Bumped by every search so late pages of an old one are dropped
+
+        # Filters
+        filter_frame = ttk.Frame(self)
+        filter_frame.pack(fill=tk.X, pady=5)
+
+        ttk.Label(filter_frame, text="Movie:").grid(row=0, column=0, sticky="w", padx=5)
+        self.movie_var = tk.StringVar(value=ALL_MOVIES)
+        self.movie_box = ttk.Combobox(filter_frame, textvariable=self.movie_var, values=[ALL_MOVIES], state='readonly', width=20)
+        self.movie_box.grid(row=1, column=0, padx=5)
+
+        self.entries = {}
+        for col, (key, label, width) in enumerate([('phone', "Phone:", 14), ('email', "Email:", 22),
+                                                   ('start_date', "From (YYYY-MM-DD):", 12),
+                                                   ('end_date', "To (YYYY-MM-DD):", 12)], start=1):
+            ttk.Label(filter_frame, text=label).grid(row=0, column=col, sticky="w", padx=5)
+            entry = ttk.Entry(filter_frame, width=width)
+            entry.grid(row=1, column=col, padx=5)
+            entry.bind("<Return>", lambda e: self.search())
+            self.entries[key] = entry
+
+        ttk.Button(filter_frame, text="Search", command=self.search).grid(row=1, column=5, padx=5)
+        ttk.Button(filter_frame, text="Clear", command=self.clear_filters).grid(row=1, column=6, padx=5)
+
+        # Booking table
+        table_frame = ttk.Frame(self)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(table_frame, columns=[key for key, _, _ in COLUMNS], show='headings')
+        for key, heading, width in COLUMNS:
+            self.tree.heading(key, text=heading)
+            self.tree.column(key, width=width, anchor="w")
+        self.scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.status_label = ttk.Label(self, text="")
+        self.status_label.pack(anchor="w", pady=5)
+
+        self.refresh()
+
+    def refresh(self):
+        # Reload the movie choices and the bookings, keeping the filters
+        self.worker.submit(booking_service.list_catalog, on_done=self._movies_loaded, owner=self)
+        self.search()
+
+    def _movies_loaded(self, movies):
+        self.movie_ids = [None] + [movie[0] for movie in movies]
+        self.movie_box.configure(values=[ALL_MOVIES] + [movie[1] for movie in movies])
+
+    def clear_filters(self):
+        self.movie_var.set(ALL_MOVIES)
+        for entry in self.entries.values():
+            entry.delete(0, tk.END)
+        self.search()
+
+    def search(self):
+        # Start again from the newest booking with the current filters
+        index = self.movie_box.current()
+        self.filters = {key: entry.get().strip() or None for key, entry in self.entries.items()}
+        self.filters['movie_id'] = self.movie_ids[index] if index > 0 else None
+        self._generation += 1
+        self.tree.delete(*self.tree.get_children())
+        self.next_key = None
+        self.loaded = 0
+        self._fetching = False
+        self._done = False
+        self._load_page()
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) >= LOAD_MORE_AT:
+            self._load_page()
+
+    def _load_page(self):
+        # Only one page is in flight at a time
+        if self._fetching or self._done:
+            return
+        self._fetching = True
+        self.status_label.configure(text="Loading bookings...")
+        generation = self._generation
+        self.worker.submit(functools.partial(booking_service.search_bookings, after=self.next_key, **self.filters),
+                           on_done=lambda page: self._page_loaded(generation, page),
+                           on_error=lambda e: self._page_failed(generation, e),
+                           owner=self)
+
+    def _page_loaded(self, generation, page):
+        if generation != self._generation:
+            return
+        self._fetching = False
+        for booking in page['bookings']:
+            values = [booking[key] if booking[key] is not None else '' for key, _, _ in COLUMNS]
+            self.tree.insert('', tk.END, iid=str(booking['id']), values=values)
+        self.loaded += len(page['bookings'])
+        self.next_key = page['next']
+        self._done = self.next_key is None
+        self.status_label.configure(text=f"{self.loaded} bookings" if self._done
+                                    else f"{self.loaded} bookings loaded, scroll for more")
+
+        # Keep going while the rows do not fill the view yet
+        if not self._done and self.tree.yview()[1] >= LOAD_MORE_AT:
+            self._load_page()
+
+    def _page_failed(self, generation, error):
+        if generation != self._generation:
+            return
+        self._fetching = False
+        self._done = True
+        self.status_label.configure(text="")
+        if isinstance(error, BookingError):
+            messagebox.showerror("Error", str(error))
+        else:
+            messagebox.showerror("Error", f"Could not load bookings: {error}")
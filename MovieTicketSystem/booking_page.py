@@ -0,0 +1,339 @@
+import functools
+import tkinter as tk
+from tkinter import ttk, messagebox
+import booking_service
+from booking_service import BookingError, SeatUnavailableError
+import metrics
+
+# Button style and widget state of a seat in each of its states
+SEAT_STYLES = {
+    'available': ('Available.TButton', 'normal'),
+    'selected': ('Selected.TButton', 'normal'),
+    'booked': ('Booked.TButton', 'disabled'),
+    'held': ('Held.TButton', 'disabled'),
+}
+
+
+class BookingPage(ttk.Frame):
+    # Customer details and seat map for booking a showing. The page is built
+    # once and reused: refresh() loads the showings and seat map of a movie in
+    # the background and updates the page in place. Seat buttons are kept
+    # while the screen layout stays the same and only the seats whose state
+    # changed are restyled, so reopening a seat map costs a query and a few
+    # configure calls rather than hundreds of new widgets.
+    def __init__(self, parent, worker, on_booked):
+        super().__init__(parent)
+        self.worker = worker
+        self.on_booked = on_booked
+        self.movie = None         # (movie_id, title, price)
+        self.showing_id = None
+        self.showing_ids = []
+        self.hold_token = None    # Seats picked on this page are held under it
+        self.selected_seats = []
+        self.pending_seats = set()  # Holds requested but not yet confirmed
+        self.seat_buttons = {}
+        self.seat_states = {}
+        self.layout_rows = None
+        self._generation = 0  # Bumped on every refresh so late results of an old one are dropped
+
+        # Header
+        self.header_label = ttk.Label(self, style='Heading.TLabel')
+        self.header_label.pack(pady=10)
+        self.status_label = ttk.Label(self, text="")
+        self.status_label.pack()
+
+        # Booking form, shown once a seat map has loaded
+        self.booking_frame = ttk.Frame(self)
+
+        # Customer Information Frame
+        customer_frame = ttk.Frame(self.booking_frame)
+        customer_frame.pack(side=tk.LEFT, padx=20, fill=tk.BOTH)
+
+        ttk.Label(customer_frame, text="Customer Information", style='Heading.TLabel', font=('Helvetica', 16, 'bold')).pack(anchor="w", pady=10)
+
+        # Showing selection; picking another showing reloads its seat map
+        ttk.Label(customer_frame, text="Showing:").pack(anchor="w", pady=5)
+        self.showing_box = ttk.Combobox(customer_frame, state='readonly', width=28)
+        self.showing_box.pack(anchor="w", pady=5)
+        self.showing_box.bind("<<ComboboxSelected>>", lambda e: self.refresh(
+            *self.movie, self.showing_ids[self.showing_box.current()]))
+
+        self.entries = {}
+        for key, label in (('name', "Name:"), ('phone', "Phone:"), ('email', "Email:")):
+            ttk.Label(customer_frame, text=label).pack(anchor="w", pady=5)
+            entry = ttk.Entry(customer_frame, width=30)
+            entry.pack(anchor="w", pady=5)
+            self.entries[key] = entry
+
+        self.price_label = ttk.Label(customer_frame)
+        self.price_label.pack(anchor="w", pady=10)
+
+        # Number of seats
+        self.max_label = ttk.Label(customer_frame)
+        self.max_label.pack(anchor="w", pady=5)
+        self.seats_var = tk.StringVar(value="1")
+        self.seats_spinbox = ttk.Spinbox(customer_frame, from_=1, to=1, textvariable=self.seats_var, width=5)
+        self.seats_spinbox.pack(anchor="w", pady=5)
+
+        # Picks and holds the best block of that many seats in one go
+        self.auto_btn = ttk.Button(customer_frame, text="Best Available", command=self.auto_select)
+        self.auto_btn.pack(anchor="w", pady=5)
+
+        # Total amount, updated when the number of seats changes
+        self.total_var = tk.StringVar()
+        ttk.Label(customer_frame, textvariable=self.total_var).pack(anchor="w", pady=10)
+        self.seats_var.trace_add('write', lambda *args: self.update_total())
+
+        # Seat Selection Frame
+        seat_frame = ttk.Frame(self.booking_frame)
+        seat_frame.pack(side=tk.RIGHT, padx=20, fill=tk.BOTH)
+
+        ttk.Label(seat_frame, text="Seat Selection", style='Heading.TLabel', font=('Helvetica', 16, 'bold')).pack(anchor="w", pady=10)
+
+        self.seats_layout = ttk.Frame(seat_frame)
+        self.seats_layout.pack(pady=10)
+        self.screen_label = ttk.Label(self.seats_layout, text="SCREEN", foreground="#ffffff", background="#3498db", font=('Helvetica', 10, 'bold'))
+
+        # Confirm Booking Button
+        self.confirm_btn = ttk.Button(self.booking_frame, text="Confirm Booking", command=self.confirm_booking)
+        self.confirm_btn.pack(pady=20)
+
+    # Loading
+
+    def refresh(self, movie_id, movie_title, price, showing_id=None):
+        # Show a movie's booking form; the first showing is selected unless
+        # one is given. The customer's details are kept when only the showing
+        # changes.
+        self.release_holds()
+        if self.movie is None or self.movie[0] != movie_id:
+            self.booking_frame.pack_forget()  # Do not show the previous movie's seats meanwhile
+        self.movie = (movie_id, movie_title, price)
+        self.header_label.configure(text=f"Book Tickets for {movie_title}")
+        self.status_label.configure(text="Loading seat map...")
+        self.confirm_btn.configure(state='disabled')
+
+        def load():
+            showings = booking_service.list_showings(movie_id)
+            if not showings:
+                raise BookingError("No showings are scheduled for this movie.")
+            return showings, booking_service.get_seat_map(showing_id or showings[0]['id'])
+
+        self._generation += 1
+        generation = self._generation
+        self.worker.submit(load,
+                           on_done=lambda result: self._show_seat_map(generation, *result),
+                           on_error=lambda e: self._load_failed(generation, e),
+                           owner=self)
+
+    def _load_failed(self, generation, error):
+        if generation == self._generation:
+            self.status_label.configure(text=f"Could not load seat map: {error}")
+
+    @metrics.timed('ui.show_seat_map')
+    def _show_seat_map(self, generation, showings, seat_map):
+        if generation != self._generation:
+            return
+        self.showing_id = seat_map['showing_id']
+        self.hold_token = booking_service.new_hold_token()
+        self.selected_seats = []
+        self.pending_seats = set()
+
+        self.showing_ids = [s['id'] for s in showings]
+        self.showing_box.configure(values=[f"{s['start_time'] or 'Open showing'} - {s['screen']}" for s in showings])
+        self.showing_box.current(self.showing_ids.index(self.showing_id))
+
+        price = self.movie[2]
+        available_seats = seat_map['available_seats']
+        self.price_label.configure(text=f"Price per Seat: ${price}")
+        self.max_label.configure(text=f"Number of Seats (max {available_seats}):")
+        self.seats_spinbox.configure(to=available_seats)
+        self.update_total()
+
+        # New buttons only when the screen layout differs from the last one
+        if seat_map['rows'] != self.layout_rows:
+            self._build_seats(seat_map['rows'])
+        booked_seats = set(seat_map['booked'])
+        held_seats = set(seat_map['held'])
+        for seat_id in self.seat_buttons:
+            self._set_seat(seat_id, 'booked' if seat_id in booked_seats
+                           else 'held' if seat_id in held_seats else 'available')
+
+        self.status_label.configure(text="")
+        self.confirm_btn.configure(state='normal')
+        self.auto_btn.configure(state='normal')
+        if not self.booking_frame.winfo_manager():
+            self.booking_frame.pack(pady=20)
+
+    def _build_seats(self, rows):
+        for btn in self.seat_buttons.values():
+            btn.destroy()
+        self.seat_buttons = {}
+        self.seat_states = {}
+        self.layout_rows = rows
+        self.screen_label.grid(row=0, column=0, columnspan=max(len(row) for row in rows), sticky="ew", pady=10)
+        for row, seat_row in enumerate(rows, start=1):
+            for col, seat_id in enumerate(seat_row, start=1):
+                if seat_id is None:  # Aisle or other gap in the layout
+                    continue
+                seat_btn = ttk.Button(self.seats_layout, text=seat_id, command=lambda s=seat_id: self.seat_click(s))
+                seat_btn.grid(row=row, column=col-1, padx=2, pady=2)
+                self.seat_buttons[seat_id] = seat_btn
+
+    def _set_seat(self, seat_id, state):
+        if self.seat_states.get(seat_id) != state:
+            style, widget_state = SEAT_STYLES[state]
+            self.seat_buttons[seat_id].configure(style=style, state=widget_state)
+            self.seat_states[seat_id] = state
+
+    def update_total(self):
+        try:
+            num_seats = int(self.seats_var.get())
+        except ValueError:
+            return
+        self.total_var.set(f"Total Amount: ${num_seats * self.movie[2]:.2f}" if self.movie else "")
+
+    # Holds
+
+    def release_holds(self):
+        # Give back the seats held on this page
+        if self.selected_seats:
+            self.worker.submit(booking_service.release_seats, self.showing_id, list(self.selected_seats), self.hold_token)
+        for seat_id in self.selected_seats:
+            self._set_seat(seat_id, 'available')
+        self.selected_seats = []
+
+    def on_hide(self):
+        # The customer left the page: free their seats and forget their details
+        self.release_holds()
+        self._generation += 1
+        for entry in self.entries.values():
+            entry.delete(0, tk.END)
+        self.seats_var.set("1")
+
+    # Selecting a seat holds it for HOLD_TTL_SECONDS so no other terminal
+    # can take it during checkout; deselecting releases the hold
+    def seat_click(self, seat_id):
+        if seat_id in self.pending_seats:
+            return
+        if seat_id in self.selected_seats:
+            self.selected_seats.remove(seat_id)
+            self._set_seat(seat_id, 'available')
+            self.worker.submit(booking_service.release_seats, self.showing_id, [seat_id], self.hold_token)
+            return
+        try:
+            limit = int(self.seats_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Number of Seats must be a valid number.")
+            return
+        if len(self.selected_seats) + len(self.pending_seats) >= limit:
+            messagebox.showwarning("Seat Selection", f"You can only select {limit} seats.")
+            return
+        self.pending_seats.add(seat_id)
+        generation, showing_id, hold_token = self._generation, self.showing_id, self.hold_token
+        self.worker.submit(booking_service.reserve_seats, showing_id, [seat_id], hold_token,
+                           on_done=lambda hold: self._seat_held(generation, seat_id, showing_id, hold_token),
+                           on_error=lambda e: self._seat_hold_failed(generation, seat_id, e),
+                           owner=self)
+
+    def _seat_held(self, generation, seat_id, showing_id, hold_token):
+        if generation != self._generation:
+            # The page moved on while the hold was being taken
+            self.worker.submit(booking_service.release_seats, showing_id, [seat_id], hold_token)
+            return
+        self.pending_seats.discard(seat_id)
+        self.selected_seats.append(seat_id)
+        self._set_seat(seat_id, 'selected')
+
+    def _seat_hold_failed(self, generation, seat_id, error):
+        if generation != self._generation:
+            return
+        self.pending_seats.discard(seat_id)
+        if isinstance(error, SeatUnavailableError):
+            self._set_seat(seat_id, 'held')
+            messagebox.showwarning("Seat Selection", f"Seat {seat_id} was just taken by another customer.")
+        else:
+            messagebox.showerror("Error", f"Could not hold seat {seat_id}: {error}")
+
+    # Seats this page already holds count as free, so the new block may
+    # reuse them; the ones it does not reuse are released
+    def auto_select(self):
+        try:
+            count = int(self.seats_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Number of Seats must be a valid number.")
+            return
+        if self.pending_seats:
+            return
+        previous = list(self.selected_seats)
+        generation, showing_id, hold_token = self._generation, self.showing_id, self.hold_token
+
+        def pick():
+            hold = booking_service.reserve_best_available(showing_id, count, hold_token)
+            stale = [seat_id for seat_id in previous if seat_id not in hold['seats']]
+            if stale:
+                booking_service.release_seats(showing_id, stale, hold_token)
+            return hold
+
+        self.auto_btn.configure(state='disabled')
+        self.worker.submit(pick, on_done=lambda hold: self._auto_selected(generation, hold),
+                           on_error=lambda e: self._auto_select_failed(generation, e), owner=self)
+
+    def _auto_selected(self, generation, hold):
+        if generation != self._generation:
+            self.worker.submit(booking_service.release_seats, hold['showing_id'], hold['seats'], hold['hold_token'])
+            return
+        self.auto_btn.configure(state='normal')
+        for seat_id in self.selected_seats:
+            self._set_seat(seat_id, 'available')
+        for seat_id in hold['seats']:
+            self._set_seat(seat_id, 'selected')
+        self.selected_seats = list(hold['seats'])
+
+    def _auto_select_failed(self, generation, error):
+        if generation != self._generation:
+            return
+        self.auto_btn.configure(state='normal')
+        if isinstance(error, (BookingError, SeatUnavailableError)):
+            messagebox.showwarning("Seat Selection", str(error))
+        else:
+            messagebox.showerror("Error", f"Could not select seats: {error}")
+
+    # Booking
+
+    @metrics.timed('ui.confirm_booking')
+    def confirm_booking(self):
+        try:
+            num_seats = int(self.seats_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Number of Seats must be a valid number.")
+            return
+
+        # Save in the background; the button stays disabled until it finishes
+        self.confirm_btn.configure(state='disabled')
+        generation = self._generation
+        self.worker.submit(functools.partial(booking_service.confirm_booking, hold_token=self.hold_token),
+                           self.showing_id, self.entries['name'].get(), self.entries['phone'].get(),
+                           self.entries['email'].get(), list(self.selected_seats), num_seats,
+                           on_done=lambda booking: self._booking_done(generation, booking),
+                           on_error=lambda e: self._booking_failed(generation, e))
+
+    # The result is always reported, but only acted on if the user is still
+    # on this booking
+    def _booking_done(self, generation, booking):
+        messagebox.showinfo("Booking Confirmation", f"Booking confirmed!\nSeats: {', '.join(booking['seats'])}\nTotal Amount: ${booking['total_amount']:.2f}")
+        if generation == self._generation:
+            self.selected_seats = []  # The holds were turned into the booking
+            self.on_booked()
+
+    def _booking_failed(self, generation, error):
+        still_here = generation == self._generation
+        if still_here:
+            self.confirm_btn.configure(state='normal')
+        if isinstance(error, SeatUnavailableError):
+            messagebox.showerror("Error", f"{error}\nPlease choose different seats.")
+            if still_here:
+                self.refresh(*self.movie, self.showing_id)
+        elif isinstance(error, BookingError):
+            messagebox.showerror("Error", str(error))
+        else:
+            messagebox.showerror("Error", f"Booking failed: {error}")
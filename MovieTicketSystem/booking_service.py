@@ -0,0 +1,368 @@
+import datetime
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from database import get_db, SeatUnavailableError, BookingCancelledError, CARD_VARIANT
+import seat_layouts
+import seatmap
+
+# Booking logic shared by the Tk app, scripts and any other front-end.
+# Nothing in here touches tkinter; every function takes an optional `db` so
+# callers can point it at a database other than the default one.
+
+# Format of showing start times
+START_TIME_FORMAT = "%Y-%m-%d %H:%M"
+
+# How long selected seats stay held for a customer before they are released
+HOLD_TTL_SECONDS = int(os.environ.get('MOVIE_BOOKING_HOLD_TTL', 300))
+
+# Times reserve_best_available picks again after losing a race for a seat
+BEST_AVAILABLE_ATTEMPTS = 3
+
+# Bookings per page of the admin booking history
+BOOKING_PAGE_SIZE = 200
+
+
+class BookingError(Exception):
+    # Raised when a request is rejected before it reaches the database
+    pass
+
+
+# Seat indexes per screen. Layouts never change once a screen exists, so
+# each one is parsed once per process instead of on every seat map.
+_layout_cache = {}
+_layout_lock = threading.Lock()
+
+
+def get_screen_layout(screen_id, db=None):
+    # The seatmap.SeatIndex of a screen: its rows and the bit of each seat
+    db = db or get_db()
+    key = (db.path, screen_id)
+    with _layout_lock:
+        cached = _layout_cache.get(key)
+    if cached is None:
+        layout = db.get_screen_layout(screen_id)
+        if layout is None:
+            raise BookingError("Screen not found.")
+        cached = seatmap.seat_index(layout)
+        with _layout_lock:
+            _layout_cache[key] = cached
+    return cached
+
+
+def clear_layout_cache():
+    with _layout_lock:
+        _layout_cache.clear()
+
+
+# Movies
+
+def search_match(query):
+    # Turn what a user typed into an FTS5 query: every word must match, each
+    # as a prefix so "aven" finds "Avengers". Punctuation is dropped, so the
+    # input can never be an FTS syntax error.
+    words = re.findall(r'\w+', query or '')
+    return ' '.join(f'"{word}"*' for word in words) or None
+
+
+def facet_value(value):
+    # Same normalization as the stored facets
+    return ' '.join((value or '').split()).casefold() or None
+
+
+def count_movies(query=None, genre=None, language=None, db=None):
+    return (db or get_db()).count_movies(search_match(query), facet_value(genre), facet_value(language))
+
+
+def list_movies(offset=0, limit=-1, query=None, genre=None, language=None, db=None):
+    # LIMIT -1 means no limit in SQLite. poster_hash identifies the poster in
+    # the poster store; movies sharing a poster share the hash. With a search
+    # `query` the best matches come first; genre and language filter on the
+    # facet index.
+    return [
+        {'id': movie_id, 'title': title, 'genre': genre, 'duration': duration,
+         'available_seats': available_seats, 'price': price,
+         'has_image': poster_hash is not None, 'poster_hash': poster_hash}
+        for movie_id, title, genre, duration, available_seats, price, poster_hash
+        in (db or get_db()).fetch_movie_page(offset, limit, search_match(query), facet_value(genre), facet_value(language))
+    ]
+
+
+def list_facets(kind, db=None):
+    # [{'value': 'drama', 'movies': 12}, ...] for kind 'genre' or 'language'
+    return [{'value': value, 'movies': count} for value, count in (db or get_db()).list_facets(kind)]
+
+
+def get_movie_image(movie_id, db=None):
+    return (db or get_db()).get_movie_image(movie_id)
+
+
+def get_poster(poster_hash, variant=CARD_VARIANT, db=None):
+    return (db or get_db()).get_poster(poster_hash, variant)
+
+
+def list_showings(movie_id, db=None):
+    return [
+        {'id': showing_id, 'start_time': start_time, 'screen_id': screen_id,
+         'screen': screen_name, 'available_seats': available_seats}
+        for showing_id, start_time, screen_id, screen_name, available_seats
+        in (db or get_db()).list_showings(movie_id)
+    ]
+
+
+def get_showing(showing_id, db=None):
+    showing = (db or get_db()).get_showing(showing_id)
+    if not showing:
+        raise BookingError("Showing not found.")
+    movie_id, screen_id, screen_name, start_time, available_seats = showing
+    return {'id': showing_id, 'movie_id': movie_id, 'screen_id': screen_id, 'screen': screen_name,
+            'start_time': start_time, 'available_seats': available_seats}
+
+
+def get_seat_bitmap(showing_id, db=None):
+    # The showing's seat index and its bitmap of sold seats
+    db = db or get_db()
+    index = get_screen_layout(get_showing(showing_id, db=db)['screen_id'], db=db)
+    return index, seatmap.SeatBitmap(len(index), db.get_seat_bitmap(showing_id))
+
+
+def get_seat_map(showing_id, hold_token=None, compact=False, db=None):
+    # `rows` lists the seat ids of each row from the screen backwards, with
+    # None where the layout has a gap, and `booked` the sold seats. With
+    # `compact` they are replaced by the layout text and `booked_bitmap`, the
+    # base64 sold-seat bitmap (see seatmap.py for the bit order). `held` are
+    # seats other customers are holding; seats held with `hold_token` are
+    # left out of it.
+    db = db or get_db()
+    showing = get_showing(showing_id, db=db)
+    index = get_screen_layout(showing['screen_id'], db=db)
+    bitmap = seatmap.SeatBitmap(len(index), db.get_seat_bitmap(showing_id))
+    seat_map = dict(showing, showing_id=showing_id,
+                    held=sorted(db.get_held_seats(showing_id, exclude_token=hold_token)))
+    if compact:
+        seat_map.update(layout=index.layout, booked_bitmap=bitmap.encode())
+    else:
+        seat_map.update(rows=index.rows, booked=index.seats_at(bitmap.set_positions()))
+    return seat_map
+
+
+# Booking
+
+def validate_customer(name, phone):
+    if not name or not phone:
+        raise BookingError("Name and Phone are required fields")
+
+
+def validate_seats(showing_id, seats, db=None):
+    db = db or get_db()
+    index = get_screen_layout(get_showing(showing_id, db=db)['screen_id'], db=db)
+    unknown = [seat for seat in seats if seat not in index]
+    if unknown:
+        raise BookingError(f"Unknown seats: {', '.join(unknown)}")
+    if len(set(seats)) != len(seats):
+        raise BookingError("Each seat can only be selected once")
+    return list(seats)
+
+
+def best_available_seats(showing_id, count, hold_token=None, db=None):
+    # Seat ids of the best `count` free seats side by side (closest to the
+    # centre of the auditorium), or None if no row has room. Seats held with
+    # `hold_token` count as free.
+    db = db or get_db()
+    if count <= 0:
+        raise BookingError("Please select at least one seat")
+    index, bitmap = get_seat_bitmap(showing_id, db=db)
+    held = db.get_held_seats(showing_id, exclude_token=hold_token)
+    positions = bitmap.best_available(index, count, blocked=index.positions_of(held & index.positions.keys()))
+    return index.seats_at(positions) if positions else None
+
+
+def new_hold_token():
+    return uuid.uuid4().hex
+
+
+def reserve_seats(showing_id, seats, hold_token=None, ttl=None, db=None):
+    # Hold seats for a customer while they finish checking out. Holding the
+    # same seats again with the same token extends the hold. Conflicts are
+    # reported here, when the seat is picked, rather than at confirmation.
+    db = db or get_db()
+    if not seats:
+        raise BookingError("Please select at least one seat")
+    seats = validate_seats(showing_id, seats, db=db)
+    hold_token = hold_token or new_hold_token()
+    expires_at = db.hold_seats(showing_id, seats, hold_token, HOLD_TTL_SECONDS if ttl is None else ttl)
+    return {'hold_token': hold_token, 'showing_id': showing_id, 'seats': seats, 'expires_at': expires_at}
+
+
+def reserve_best_available(showing_id, count, hold_token=None, ttl=None, db=None):
+    # Pick the best block of `count` seats and hold it. Another terminal may
+    # take a seat between the pick and the hold, so a conflict picks again.
+    db = db or get_db()
+    hold_token = hold_token or new_hold_token()
+    for attempt in range(BEST_AVAILABLE_ATTEMPTS):
+        seats = best_available_seats(showing_id, count, hold_token, db=db)
+        if seats is None:
+            raise BookingError(f"No {count} seats are available together")
+        try:
+            return reserve_seats(showing_id, seats, hold_token, ttl, db=db)
+        except SeatUnavailableError:
+            if attempt == BEST_AVAILABLE_ATTEMPTS - 1:
+                raise
+
+
+def release_seats(showing_id, seats, hold_token, db=None):
+    (db or get_db()).release_holds(showing_id, seats, hold_token)
+
+
+def sweep_expired_holds(db=None):
+    return (db or get_db()).sweep_expired_holds()
+
+
+def confirm_booking(showing_id, name, phone, email, seats, num_seats=None, hold_token=None, db=None):
+    db = db or get_db()
+    if not all(isinstance(value, str) for value in (name, phone, email or '')):
+        raise BookingError("Name, phone and email must be text")
+    name, phone, email = name.strip(), phone.strip(), (email or '').strip()
+    validate_customer(name, phone)
+
+    if num_seats is not None and len(seats) != num_seats:
+        raise BookingError(f"Please select exactly {num_seats} seats")
+    if not seats:
+        raise BookingError("Please select at least one seat")
+    seats = validate_seats(showing_id, seats, db=db)
+
+    # Price comes from the catalog, not from the client
+    movie_id = get_showing(showing_id, db=db)['movie_id']
+    price = db.get_price(movie_id)
+    if price is None:
+        raise BookingError("Movie not found.")
+    total_amount = len(seats) * price
+
+    booking_date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    booking_id = db.insert_booking(showing_id, name, phone, email, seats, total_amount, booking_date, hold_token=hold_token)
+    return {
+        'id': booking_id,
+        'movie_id': movie_id,
+        'showing_id': showing_id,
+        'seats': seats,
+        'total_amount': total_amount,
+        'booking_date': booking_date,
+    }
+
+
+def cancel_booking(booking_id, db=None):
+    # Release a booking's seats and drop it from the sales figures. The
+    # booking stays on record, marked cancelled, and in the booking journal.
+    try:
+        cancelled = (db or get_db()).cancel_booking(booking_id)
+    except BookingCancelledError as e:
+        raise BookingError(str(e))
+    if cancelled is None:
+        raise BookingError("Booking not found.")
+    showing_id, seats, total_amount = cancelled
+    return {'id': booking_id, 'showing_id': showing_id, 'seats': seats, 'refund': total_amount}
+
+
+# Admin
+
+def authenticate_admin(username, password, db=None):
+    return (db or get_db()).check_admin(username.strip(), password.strip())
+
+
+def search_bookings(limit=BOOKING_PAGE_SIZE, after=None, movie_id=None, start_date=None, end_date=None,
+                    phone=None, email=None, db=None):
+    # One page of bookings, newest first, matching every filter given. Dates
+    # are YYYY-MM-DD and both ends are inclusive. Pass the returned `next`
+    # as `after` to get the following page; it is None on the last page.
+    start = end = None
+    try:
+        if start_date:
+            start = datetime.datetime.strptime(start_date, "%Y-%m-%d").strftime("%Y-%m-%d")
+        if end_date:
+            end = (datetime.datetime.strptime(end_date, "%Y-%m-%d") + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+    except ValueError:
+        raise BookingError("Dates must be in the form YYYY-MM-DD")
+    rows = (db or get_db()).fetch_bookings_page(limit, after=tuple(after) if after else None, movie_id=movie_id,
+                                                start=start, end=end, phone=(phone or '').strip() or None,
+                                                email=(email or '').strip() or None)
+    bookings = [
+        {'id': booking_id, 'booking_date': booking_date, 'movie_id': movie_id, 'movie': title,
+         'start_time': start_time, 'customer_name': name, 'phone': phone, 'email': email,
+         'seats': seats, 'total_amount': total_amount}
+        for booking_id, booking_date, movie_id, title, start_time, name, phone, email, seats, total_amount in rows
+    ]
+    next_key = (bookings[-1]['booking_date'], bookings[-1]['id']) if len(bookings) == limit else None
+    return {'bookings': bookings, 'next': next_key}
+
+
+def sales_summary(db=None):
+    db = db or get_db()
+    return {
+        'total_sales': db.total_sales(),
+        'movie_purchases': db.movie_purchases(),
+    }
+
+
+def validate_movie(title, language, duration, release_date, genre, total_seats, price):
+    if not title or not language or not duration or not release_date or not genre:
+        raise BookingError("All fields are required.")
+    if total_seats <= 0 or price < 0:
+        raise BookingError("Total Seats must be positive and Price cannot be negative.")
+
+
+def list_catalog(db=None):
+    return (db or get_db()).fetch_movie_list()
+
+
+def get_movie(movie_id, db=None):
+    return (db or get_db()).get_movie(movie_id)
+
+
+def add_movie(title, description, language, duration, release_date, genre, total_seats, price, image, db=None):
+    validate_movie(title, language, duration, release_date, genre, total_seats, price)
+    return (db or get_db()).insert_movie(title, description, language, duration, release_date, genre, total_seats, price, image)
+
+
+def add_movies(movies, db=None):
+    # Bulk add for imports; see Database.insert_movies for the row format
+    for title, description, language, duration, release_date, genre, total_seats, price, image, start_times in movies:
+        validate_movie(title, language, duration, release_date, genre, total_seats, price)
+    return (db or get_db()).insert_movies(movies)
+
+
+def update_movie(movie_id, title, description, language, duration, release_date, genre, total_seats, price, image, db=None):
+    validate_movie(title, language, duration, release_date, genre, total_seats, price)
+    (db or get_db()).update_movie(movie_id, title, description, language, duration, release_date, genre, total_seats, price, image)
+
+
+def delete_movie(movie_id, db=None):
+    (db or get_db()).delete_movie(movie_id)
+
+
+def add_screen(name, layout, db=None):
+    name = name.strip()
+    if not name:
+        raise BookingError("Screen name is required.")
+    try:
+        seat_layouts.parse_layout(layout)
+    except ValueError as e:
+        raise BookingError(str(e))
+    try:
+        return (db or get_db()).insert_screen(name, layout.strip())
+    except sqlite3.IntegrityError:
+        raise BookingError(f"A screen named '{name}' already exists.")
+
+
+def add_showing(movie_id, screen_id, start_time, db=None):
+    db = db or get_db()
+    if db.get_price(movie_id) is None:
+        raise BookingError("Movie not found.")
+    get_screen_layout(screen_id, db=db)
+    if start_time:
+        try:
+            datetime.datetime.strptime(start_time, START_TIME_FORMAT)
+        except ValueError:
+            raise BookingError("Start time must be in the form YYYY-MM-DD HH:MM")
+    return db.insert_showing(movie_id, screen_id, start_time or None)
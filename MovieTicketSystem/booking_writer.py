@@ -0,0 +1,101 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import metrics
+
+# Group commit for bookings and holds. Writes submitted from many threads are
+# queued and a single writer thread runs them in batches: one BEGIN IMMEDIATE
+# and one COMMIT per batch instead of per booking, so a rush of confirmations
+# takes the write lock and writes the showing and movie pages once per batch.
+#
+# Each write runs in its own savepoint. A write that fails (seats already
+# taken, bad input) is rolled back on its own and only its caller gets the
+# error; the rest of the batch still commits. Results are handed out after
+# the COMMIT, so a caller never hears about a booking that is not saved.
+
+# Writes committed together at most
+GROUP_COMMIT_MAX_BATCH = 64
+
+# How long (seconds) the first write of a batch waits for others to join it.
+# Writes that queue up while a batch commits form the next batch anyway, so
+# by default nothing waits: a lone booking commits at once and batches grow
+# with the load. A small delay only pays off when each commit is expensive.
+GROUP_COMMIT_MAX_DELAY = 0
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    def __init__(self, db, max_batch=GROUP_COMMIT_MAX_BATCH, max_delay=GROUP_COMMIT_MAX_DELAY):
+        self.db = db
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args):
+        # Queue func(*args) and return a Future for its result. func runs on
+        # the writer thread inside the batch transaction, so it must use self.db.
+        future = Future()
+        self._queue.put((func, args, future))
+        return future
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _next_batch(self):
+        # Block for the first write, take whatever else is queued and wait up
+        # to max_delay for stragglers. Returns None once closed.
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.perf_counter()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)  # Finish this batch, stop on the next
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._commit(batch)
+
+    def _commit(self, batch):
+        outcomes = []
+        try:
+            with metrics.timed('writer.batch'):
+                with self.db.transaction(immediate=True):
+                    for func, args, future in batch:
+                        try:
+                            with self.db.savepoint():
+                                outcomes.append((future, func(*args), None))
+                        except Exception as e:
+                            outcomes.append((future, None, e))
+        except Exception as e:
+            # BEGIN or COMMIT failed, so nothing in the batch was saved
+            for func, args, future in batch:
+                future.set_exception(e)
+            return
+        metrics.increment('writer.batches')
+        metrics.increment('writer.writes', len(batch))
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
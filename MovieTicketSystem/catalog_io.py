@@ -0,0 +1,194 @@
+import csv
+import datetime
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import booking_service
+from booking_service import BookingError, START_TIME_FORMAT
+from database import get_db, CARD_VARIANT
+
+# Bulk import and export of the movie catalog and of bookings.
+#
+# A manifest is a CSV file with a header row, a JSON Lines file (one movie
+# object per line) or a JSON array, with these fields:
+#
+#   title, description, language, duration, release_date, genre,
+#   total_seats, price, poster, start_times
+#
+# `poster` is an image file name relative to the poster directory and
+# `start_times` lists showing times as "YYYY-MM-DD HH:MM", separated by ';'
+# in CSV. Both are optional. Manifests are read row by row and imported in
+# batches: posters of a batch are resized in a process pool while the
+# previous batch is written in one transaction.
+
+MANIFEST_FIELDS = ['title', 'description', 'language', 'duration', 'release_date', 'genre',
+                   'total_seats', 'price', 'poster', 'start_times']
+
+BOOKING_FIELDS = ['id', 'movie_id', 'movie', 'showing_id', 'start_time', 'customer_name', 'phone',
+                  'email', 'seats', 'total_amount', 'booking_date']
+
+# Movies written per transaction
+IMPORT_BATCH_SIZE = 200
+
+
+def read_manifest(path):
+    # Yields (line number, movie dict) without reading the whole file
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+    elif path.endswith('.jsonl'):
+        with open(path, encoding='utf-8') as f:
+            for line_num, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_num, json.loads(line)
+    else:
+        with open(path, encoding='utf-8') as f:
+            for number, row in enumerate(json.load(f), start=1):
+                yield number, row
+
+
+def parse_movie(row):
+    # Manifest row -> insert_movies arguments without the image, and the
+    # poster file name. Raises BookingError for a bad row.
+    try:
+        total_seats = int(row.get('total_seats') or 0)
+        price = float(row.get('price') or 0)
+    except (TypeError, ValueError):
+        raise BookingError("Total Seats and Price must be valid numbers.")
+    fields = [str(row.get(name) or '').strip()
+              for name in ('title', 'description', 'language', 'duration', 'release_date', 'genre')]
+    title, description, language, duration, release_date, genre = fields
+    booking_service.validate_movie(title, language, duration, release_date, genre, total_seats, price)
+
+    start_times = row.get('start_times') or []
+    if isinstance(start_times, str):
+        start_times = [t.strip() for t in start_times.split(';') if t.strip()]
+    if not isinstance(start_times, list):
+        raise BookingError("Start times must be a list or a ';' separated string.")
+    for start_time in start_times:
+        if not isinstance(start_time, str):
+            raise BookingError(f"Start time must be in the form YYYY-MM-DD HH:MM: {start_time!r}")
+        try:
+            datetime.datetime.strptime(start_time, START_TIME_FORMAT)
+        except ValueError:
+            raise BookingError(f"Start time must be in the form YYYY-MM-DD HH:MM: {start_time!r}")
+
+    movie = [title, description, language, duration, release_date, genre, total_seats, price, None, start_times]
+    return movie, (row.get('poster') or '').strip()
+
+
+def load_poster_file(path):
+    # Runs in a pool process: read one poster and encode the card image and
+    # the other variants the poster store keeps
+    from thumbnails import encode_poster, POSTER_VARIANTS
+    with open(path, 'rb') as f:
+        data = f.read()
+    variants = {CARD_VARIANT: encode_poster(data)}
+    for variant, size in POSTER_VARIANTS.items():
+        variants[variant] = encode_poster(data, size)
+    return variants
+
+
+def import_catalog(manifest, poster_dir=None, batch_size=IMPORT_BATCH_SIZE, workers=None, db=None, report=print):
+    # Returns (number imported, list of (line, error) for skipped rows)
+    poster_dir = poster_dir or os.path.dirname(os.path.abspath(manifest))
+    errors = []
+    imported = 0
+
+    def write(batch):
+        # Wait for the batch's posters and insert what survived
+        movies = []
+        for line_num, movie, future in batch:
+            if future is not None:
+                try:
+                    movie[8] = future.result()
+                except Exception as e:
+                    errors.append((line_num, f"Poster could not be loaded: {e}"))
+                    continue
+            movies.append(movie)
+        if movies:
+            booking_service.add_movies(movies, db=db)
+        return len(movies)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        batch = []
+        pending = None  # Previous batch, written once the next one is queued
+        for line_num, row in read_manifest(manifest):
+            try:
+                movie, poster = parse_movie(row)
+            except BookingError as e:
+                errors.append((line_num, str(e)))
+                continue
+            future = pool.submit(load_poster_file, os.path.join(poster_dir, poster)) if poster else None
+            batch.append((line_num, movie, future))
+            if len(batch) >= batch_size:
+                if pending:
+                    imported += write(pending)
+                    report(f"Imported {imported} movies")
+                pending, batch = batch, []
+        for remaining in (pending, batch):
+            if remaining:
+                imported += write(remaining)
+    return imported, errors
+
+
+def check_export_path(path):
+    if not path.endswith(('.csv', '.jsonl')):
+        raise BookingError("Export file must end in .csv or .jsonl")
+
+
+class ManifestWriter:
+    # Writes rows as CSV or JSON Lines depending on the file name
+    def __init__(self, f, path, fields):
+        self.f = f
+        self.fields = fields
+        self.csv = None
+        if path.endswith('.csv'):
+            self.csv = csv.writer(f)
+            self.csv.writerow(fields)
+
+    def write(self, values):
+        if self.csv:
+            self.csv.writerow(';'.join(v) if isinstance(v, list) else v for v in values)
+        else:
+            self.f.write(json.dumps(dict(zip(self.fields, values))) + '\n')
+
+
+def export_catalog(path, poster_dir=None, db=None):
+    # Writes the catalog as a manifest import_catalog can read back. Posters
+    # are streamed to poster_dir one at a time, named by their hash so a
+    # poster shared by several movies is written once; without poster_dir
+    # they are left out. Returns the number of movies written.
+    check_export_path(path)
+    db = db or get_db()
+    if poster_dir:
+        os.makedirs(poster_dir, exist_ok=True)
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = ManifestWriter(f, path, MANIFEST_FIELDS)
+        for movie_id, *fields, poster_hash, start_times in db.iter_movies():
+            poster = ''
+            if poster_hash and poster_dir:
+                poster = f"{poster_hash}.png"
+                poster_path = os.path.join(poster_dir, poster)
+                if not os.path.exists(poster_path):
+                    with open(poster_path, 'wb') as out:
+                        db.copy_poster(poster_hash, out)
+            times = start_times.split(';') if start_times else []
+            writer.write(fields + [poster, times])
+            count += 1
+    return count
+
+
+def export_bookings(path, db=None):
+    check_export_path(path)
+    db = db or get_db()
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = ManifestWriter(f, path, BOOKING_FIELDS)
+        for row in db.iter_bookings():
+            writer.write(list(row))
+            count += 1
+    return count
@@ -0,0 +1,729 @@
+import sqlite3
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+import journal
+import metrics
+import migrations
+import seat_layouts
+import seatmap
+
+# Database file used when nothing else is configured. Can be overridden with the
+# MOVIE_BOOKING_DB environment variable or by calling configure().
+DEFAULT_DB_PATH = os.environ.get('MOVIE_BOOKING_DB', 'movie_booking.db')
+
+# Number of compiled statements each connection keeps around for reuse
+STATEMENT_CACHE_SIZE = 256
+
+# How long a writer waits on a locked database before giving up (milliseconds)
+BUSY_TIMEOUT_MS = 5000
+
+# bm25 weights of the title, description and genre columns in movie search
+SEARCH_WEIGHTS = (10.0, 1.0, 3.0)
+
+# A BEGIN IMMEDIATE slower than this (seconds) waited on another writer and
+# is counted as a busy wait
+BUSY_WAIT_THRESHOLD = 0.001
+
+# Rows fetched per round trip when streaming a table out
+EXPORT_FETCH_SIZE = 500
+
+# Bytes copied per read when streaming a poster out of the database
+BLOB_CHUNK_SIZE = 64 * 1024
+
+
+# Poster variant shown on movie cards; every stored poster has it
+CARD_VARIANT = 'card'
+
+
+def poster_hash(data):
+    # Posters are stored under the SHA-256 of their card image
+    return hashlib.sha256(data).hexdigest()
+
+
+class SeatUnavailableError(Exception):
+    # Raised when a booking asks for seats that are already taken
+    def __init__(self, seats):
+        super().__init__(f"Seats no longer available: {', '.join(seats)}")
+        self.seats = seats
+
+
+class BookingCancelledError(Exception):
+    # Raised when cancelling a booking that was already cancelled
+    def __init__(self, booking_id):
+        super().__init__(f"Booking {booking_id} was already cancelled.")
+        self.booking_id = booking_id
+
+
+class Database:
+    # One Database per database file. Every thread gets its own long-lived
+    # connection, so screens and workers reuse an open handle (and its page and
+    # statement caches) instead of reconnecting on every query.
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _connect(self):
+        # isolation_level=None leaves transaction control to transaction()
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        if self.path != ':memory:':
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        conn = self.connection()
+        if conn.in_transaction:
+            # Nested use joins the transaction that is already open
+            yield conn
+            return
+        if immediate:
+            self._begin_immediate(conn)
+        else:
+            conn.execute("BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        else:
+            try:
+                conn.execute("COMMIT")
+            except BaseException:
+                # A failed COMMIT (SQLITE_BUSY, disk full) can leave the
+                # transaction open; later calls would join it and their
+                # writes would never be committed
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    @contextmanager
+    def savepoint(self, name='sp'):
+        # Undo just this block on error, inside a transaction that carries on
+        conn = self.connection()
+        conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute(f"ROLLBACK TO {name}")
+            conn.execute(f"RELEASE {name}")
+            raise
+        else:
+            conn.execute(f"RELEASE {name}")
+
+    def _begin_immediate(self, conn):
+        # Taking the write lock is where writers queue behind each other, so
+        # its wait time and busy failures are recorded
+        start = time.perf_counter()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            if 'locked' in str(e) or 'busy' in str(e):
+                metrics.increment('db.busy_errors')
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            metrics.observe('db.write_lock_wait', waited)
+            if waited > BUSY_WAIT_THRESHOLD:
+                metrics.increment('db.busy_waits')
+
+    def execute(self, sql, params=()):
+        return self.connection().execute(sql, params)
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    # Schema
+
+    def setup(self):
+        # Once the schema is current and seeded, its version is stored in the
+        # file header (PRAGMA user_version), so a restart reads one pragma
+        # and skips the migration check and seeding
+        if migrations.is_current(self.connection()):
+            self.snapshot_journal(only_if_due=True)
+            return
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+
+            # Bring the schema up to date
+            migrations.migrate(conn)
+
+            # Insert default admin if not exists
+            cursor.execute("SELECT * FROM admin WHERE username = 'admin'")
+            if not cursor.fetchone():
+                cursor.execute("INSERT INTO admin (username, password) VALUES (?, ?)", ('admin', 'admin123'))
+
+            # Insert sample movies if table is empty
+            cursor.execute("SELECT COUNT(*) FROM movies")
+            if cursor.fetchone()[0] == 0:
+                sample_movies = [
+                    ('Avengers: Endgame', 'After the devastating events of Infinity War, the universe is in ruins. With the help of remaining allies, the Avengers assemble once more to reverse Thanos\' actions and restore balance to the universe.', 'English', '3h 1m', '2019-04-26', 'Action, Adventure, Drama', 100, 12.99, None),
+                    ('The Lion King', 'After the murder of his father, a young lion prince flees his kingdom only to learn the true meaning of responsibility and bravery.', 'English', '1h 58m', '2019-07-19', 'Animation, Adventure, Drama', 100, 9.99, None),
+                    ('Joker', 'In Gotham City, mentally troubled comedian Arthur Fleck is disregarded and mistreated by society. He then embarks on a downward spiral of revolution and bloody crime. This path brings him face-to-face with his alter-ego: the Joker.', 'English', '2h 2m', '2019-10-04', 'Crime, Drama, Thriller', 100, 10.99, None),
+                    ('Parasite', 'Greed and class discrimination threaten the newly formed symbiotic relationship between the wealthy Park family and the destitute Kim clan.', 'Korean', '2h 12m', '2019-10-11', 'Comedy, Drama, Thriller', 100, 11.99, None),
+                ]
+                for movie in sample_movies:
+                    self.insert_movie(*movie)
+
+            migrations.mark_current(cursor)
+
+    # Movies
+
+    def _movie_filter(self, match, genre, language):
+        # FROM/WHERE clauses and ORDER BY for a catalog search. `match` is an
+        # FTS5 query; matches are ranked with title hits weighing most.
+        sql, params = "FROM movies m", []
+        order = "m.id"
+        if match:
+            sql += " JOIN movies_fts f ON f.rowid = m.id"
+            order = f"bm25(movies_fts, {', '.join(map(str, SEARCH_WEIGHTS))}), m.id"
+        conditions = []
+        if match:
+            conditions.append("movies_fts MATCH ?")
+            params.append(match)
+        for kind, value in (('genre', genre), ('language', language)):
+            if value:
+                conditions.append("m.id IN (SELECT movie_id FROM movie_facets WHERE kind = ? AND value = ?)")
+                params.extend((kind, value))
+        if conditions:
+            sql += f" WHERE {' AND '.join(conditions)}"
+        return sql, params, order
+
+    def count_movies(self, match=None, genre=None, language=None):
+        sql, params, _ = self._movie_filter(match, genre, language)
+        return self.execute(f"SELECT COUNT(*) {sql}", params).fetchone()[0]
+
+    def fetch_movie_page(self, offset, limit, match=None, genre=None, language=None):
+        # Card data without the poster itself; posters are loaded per card
+        sql, params, order = self._movie_filter(match, genre, language)
+        return self.execute(f'''
+            SELECT m.id, m.title, m.genre, m.duration, m.available_seats, m.price, m.poster_hash
+            {sql} ORDER BY {order} LIMIT ? OFFSET ?
+        ''', (*params, limit, offset)).fetchall()
+
+    def list_facets(self, kind):
+        # Values of a facet with the number of movies having each
+        return self.execute("SELECT value, COUNT(*) FROM movie_facets WHERE kind = ? GROUP BY value ORDER BY value",
+                            (kind,)).fetchall()
+
+    def rebuild_movie_search(self):
+        with self.transaction(immediate=True) as conn:
+            migrations.rebuild_movie_search(conn.cursor())
+
+    def get_movie_image(self, movie_id):
+        row = self.execute('''
+            SELECT p.data FROM movies m JOIN posters p ON p.hash = m.poster_hash AND p.variant = ?
+            WHERE m.id = ?
+        ''', (CARD_VARIANT, movie_id)).fetchone()
+        return row[0] if row else None
+
+    def fetch_movie_list(self):
+        return self.execute("SELECT id, title, description, language, duration, genre, total_seats, available_seats, price FROM movies").fetchall()
+
+    def get_movie(self, movie_id):
+        return self.execute('''
+            SELECT m.title, m.description, m.language, m.duration, m.release_date, m.genre, m.total_seats, m.price, p.data
+            FROM movies m LEFT JOIN posters p ON p.hash = m.poster_hash AND p.variant = ?
+            WHERE m.id = ?
+        ''', (CARD_VARIANT, movie_id)).fetchone()
+
+    def get_price(self, movie_id):
+        # Ticket price alone, for the booking path; None if there is no such movie
+        row = self.execute("SELECT price FROM movies WHERE id = ?", (movie_id,)).fetchone()
+        return row[0] if row else None
+
+    def insert_movie(self, title, description, language, duration, release_date, genre, total_seats, price, image):
+        with self.transaction() as conn:
+            cursor = conn.execute('''
+                INSERT INTO movies (title, description, language, duration, release_date, genre, total_seats, available_seats, price, poster_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?)
+            ''', (title, description, language, duration, release_date, genre, total_seats, price, self._store_poster(conn, image)))
+            movie_id = cursor.lastrowid
+            migrations.index_movie_facets(conn.cursor(), movie_id, genre, language)
+
+            # New movies start with one showing on a screen of total_seats seats
+            screen_id = self.default_screen(total_seats)
+            self.insert_showing(movie_id, screen_id, None)
+            return movie_id
+
+    def insert_movies(self, movies):
+        # Bulk insert_movie for imports: one transaction and executemany for
+        # the movie and showing rows. Each entry is insert_movie's arguments
+        # followed by a list of showing start times; no start times gives one
+        # open showing, like insert_movie. An image may also be a dict of
+        # poster variants (see _store_poster). Returns the new ids in order.
+        with self.transaction(immediate=True) as conn:
+            # Under the write lock new rows get ids above the current maximum
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM movies").fetchone()[0]
+            conn.executemany('''
+                INSERT INTO movies (title, description, language, duration, release_date, genre, total_seats, available_seats, price, poster_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(title, description, language, duration, release_date, genre, total_seats,
+                   total_seats * max(len(start_times), 1), price, self._store_poster(conn, image))
+                  for title, description, language, duration, release_date, genre, total_seats, price, image, start_times
+                  in movies])
+            movie_ids = [movie_id for movie_id, in conn.execute(
+                "SELECT id FROM movies WHERE id > ? ORDER BY id", (last_id,))]
+            conn.executemany("INSERT INTO movie_facets (kind, value, movie_id) VALUES (?, ?, ?)",
+                             [(kind, value, movie_id) for movie_id, movie in zip(movie_ids, movies)
+                              for kind, value in migrations.movie_facets(movie[5], movie[2])])
+
+            screens = {}
+            showings = []
+            for movie_id, movie in zip(movie_ids, movies):
+                total_seats, start_times = movie[6], movie[9]
+                if total_seats not in screens:
+                    screens[total_seats] = self.default_screen(total_seats)
+                empty = seatmap.SeatBitmap(total_seats).to_bytes()
+                for start_time in start_times or [None]:
+                    showings.append((movie_id, screens[total_seats], start_time, total_seats, empty))
+            conn.executemany(
+                "INSERT INTO showings (movie_id, screen_id, start_time, available_seats, seat_bitmap) VALUES (?, ?, ?, ?, ?)",
+                showings)
+            return movie_ids
+
+    def update_movie(self, movie_id, title, description, language, duration, release_date, genre, total_seats, price, image):
+        # Capacity of existing showings is defined by their screens and is not
+        # changed here; total_seats only sizes the first showing of a new movie
+        with self.transaction() as conn:
+            old_hash = self._poster_hash_of(conn, movie_id)
+            conn.execute('''
+                UPDATE movies
+                SET title = ?, description = ?, language = ?, duration = ?, release_date = ?, genre = ?,
+                    total_seats = ?, price = ?, poster_hash = ?
+                WHERE id = ?
+            ''', (title, description, language, duration, release_date, genre, total_seats, price,
+                  self._store_poster(conn, image), movie_id))
+            migrations.index_movie_facets(conn.cursor(), movie_id, genre, language)
+            self._drop_unused_poster(conn, old_hash)
+
+    def delete_movie(self, movie_id):
+        with self.transaction() as conn:
+            old_hash = self._poster_hash_of(conn, movie_id)
+            conn.execute("DELETE FROM seat_inventory WHERE showing_id IN (SELECT id FROM showings WHERE movie_id = ?)", (movie_id,))
+            conn.execute("DELETE FROM seat_holds WHERE showing_id IN (SELECT id FROM showings WHERE movie_id = ?)", (movie_id,))
+            conn.execute("DELETE FROM showings WHERE movie_id = ?", (movie_id,))
+            conn.execute("DELETE FROM movie_facets WHERE movie_id = ?", (movie_id,))
+            conn.execute("DELETE FROM movies WHERE id = ?", (movie_id,))
+            self._drop_unused_poster(conn, old_hash)
+
+    def iter_movies(self):
+        # Every movie without its poster, streamed a page of rows at a time.
+        # Start times of the movie's showings come joined with ';'.
+        cursor = self.connection().cursor()
+        cursor.execute('''
+            SELECT m.id, m.title, m.description, m.language, m.duration, m.release_date, m.genre,
+                   m.total_seats, m.price, m.poster_hash,
+                   (SELECT GROUP_CONCAT(s.start_time, ';') FROM showings s WHERE s.movie_id = m.id)
+            FROM movies m ORDER BY m.id
+        ''')
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+
+    # Posters
+
+    def _store_poster(self, conn, image):
+        # Store a poster unless an identical one exists and return its hash.
+        # `image` is the card image, or a dict of variant name -> image that
+        # includes CARD_VARIANT; None means no poster.
+        if not image:
+            return None
+        variants = image if isinstance(image, dict) else {CARD_VARIANT: image}
+        digest = poster_hash(variants[CARD_VARIANT])
+        conn.executemany("INSERT OR IGNORE INTO posters (hash, variant, data) VALUES (?, ?, ?)",
+                         [(digest, variant, data) for variant, data in variants.items()])
+        return digest
+
+    def _poster_hash_of(self, conn, movie_id):
+        row = conn.execute("SELECT poster_hash FROM movies WHERE id = ?", (movie_id,)).fetchone()
+        return row[0] if row else None
+
+    def _drop_unused_poster(self, conn, digest):
+        # Delete a poster once no movie refers to it any more
+        if digest:
+            conn.execute("DELETE FROM posters WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM movies WHERE poster_hash = ?)",
+                         (digest, digest))
+
+    def get_poster(self, digest, variant=CARD_VARIANT):
+        # The requested variant, falling back to the card image
+        row = self.execute('''
+            SELECT data FROM posters WHERE hash = ? AND variant IN (?, ?)
+            ORDER BY variant = ? DESC LIMIT 1
+        ''', (digest, variant, CARD_VARIANT, variant)).fetchone()
+        return row[0] if row else None
+
+    def copy_poster(self, digest, out, variant=CARD_VARIANT):
+        # Stream a poster into the file object `out` without loading it whole
+        conn = self.connection()
+        row = conn.execute("SELECT id FROM posters WHERE hash = ? AND variant = ?", (digest, variant)).fetchone()
+        if not row:
+            raise KeyError(digest)
+        with conn.blobopen('posters', 'data', row[0], readonly=True) as blob:
+            while True:
+                chunk = blob.read(BLOB_CHUNK_SIZE)
+                if not chunk:
+                    return
+                out.write(chunk)
+
+    # Screens and showings
+
+    def insert_screen(self, name, layout):
+        with self.transaction() as conn:
+            return conn.execute("INSERT INTO screens (name, layout) VALUES (?, ?)", (name, layout)).lastrowid
+
+    def list_screens(self):
+        return self.execute("SELECT id, name, layout FROM screens ORDER BY id").fetchall()
+
+    def get_screen_layout(self, screen_id):
+        row = self.execute("SELECT layout FROM screens WHERE id = ?", (screen_id,)).fetchone()
+        return row[0] if row else None
+
+    def default_screen(self, capacity):
+        # A screen with the generated layout for `capacity` seats, created if needed
+        layout = seat_layouts.default_layout(capacity)
+        with self.transaction() as conn:
+            row = conn.execute("SELECT id FROM screens WHERE layout = ? ORDER BY id LIMIT 1", (layout,)).fetchone()
+            if row:
+                return row[0]
+            # Screen names are unique and screens can be given any name, so
+            # skip numbers that are already taken
+            number = conn.execute("SELECT COUNT(*) FROM screens").fetchone()[0] + 1
+            while conn.execute("SELECT 1 FROM screens WHERE name = ?", (f"Screen {number}",)).fetchone():
+                number += 1
+            return self.insert_screen(f"Screen {number}", layout)
+
+    def insert_showing(self, movie_id, screen_id, start_time):
+        with self.transaction() as conn:
+            capacity = seat_layouts.seat_count(self.get_screen_layout(screen_id))
+            showing_id = conn.execute(
+                "INSERT INTO showings (movie_id, screen_id, start_time, available_seats, seat_bitmap) VALUES (?, ?, ?, ?, ?)",
+                (movie_id, screen_id, start_time, capacity, seatmap.SeatBitmap(capacity).to_bytes())).lastrowid
+            conn.execute("UPDATE movies SET available_seats = available_seats + ? WHERE id = ?", (capacity, movie_id))
+            return showing_id
+
+    def list_showings(self, movie_id):
+        return self.execute('''
+            SELECT s.id, s.start_time, s.screen_id, c.name, s.available_seats
+            FROM showings s JOIN screens c ON c.id = s.screen_id
+            WHERE s.movie_id = ? ORDER BY s.start_time, s.id
+        ''', (movie_id,)).fetchall()
+
+    def get_showing(self, showing_id):
+        return self.execute('''
+            SELECT s.movie_id, s.screen_id, c.name, s.start_time, s.available_seats
+            FROM showings s JOIN screens c ON c.id = s.screen_id
+            WHERE s.id = ?
+        ''', (showing_id,)).fetchone()
+
+    def get_seat_bitmap(self, showing_id):
+        row = self.execute("SELECT seat_bitmap FROM showings WHERE id = ?", (showing_id,)).fetchone()
+        return row[0] if row else None
+
+    def rebuild_seat_bitmaps(self):
+        with self.transaction(immediate=True) as conn:
+            migrations.rebuild_seat_bitmaps(conn.cursor())
+
+    def _seat_state(self, conn, showing_id):
+        # Movie, seat index and sold-seat bitmap of a showing, or None
+        row = conn.execute('''
+            SELECT s.movie_id, s.seat_bitmap, c.layout
+            FROM showings s JOIN screens c ON c.id = s.screen_id
+            WHERE s.id = ?
+        ''', (showing_id,)).fetchone()
+        if not row:
+            return None
+        movie_id, data, layout = row
+        index = seatmap.seat_index(layout)
+        return movie_id, index, seatmap.SeatBitmap(len(index), data)
+
+    # Seat holds
+
+    def _unavailable_seats(self, conn, showing_id, index, bitmap, seats, hold_token, now):
+        # Seats among `seats` that are sold, not in the layout or held by someone else
+        taken = {seat_id for seat_id in seats
+                 if seat_id not in index or bitmap.is_set(index.positions[seat_id])}
+        marks = ','.join('?' * len(seats))
+        taken.update(seat_id for seat_id, in conn.execute(
+            f"SELECT seat_id FROM seat_holds WHERE showing_id = ? AND seat_id IN ({marks}) AND expires_at > ? AND hold_token IS NOT ?",
+            (showing_id, *seats, now, hold_token)))
+        return sorted(taken)
+
+    def hold_seats(self, showing_id, seats, hold_token, ttl):
+        # Hold seats for `ttl` seconds, or extend holds the token already has.
+        # Fails without holding anything if any seat is sold or held by another
+        # token; expired holds count as free.
+        now = time.time()
+        with self.transaction(immediate=True) as conn:
+            state = self._seat_state(conn, showing_id)
+            if state is None:
+                raise SeatUnavailableError(list(seats))
+            _, index, bitmap = state
+            unavailable = self._unavailable_seats(conn, showing_id, index, bitmap, seats, hold_token, now)
+            if unavailable:
+                raise SeatUnavailableError(unavailable)
+            conn.executemany('''
+                INSERT INTO seat_holds (showing_id, seat_id, hold_token, expires_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (showing_id, seat_id) DO UPDATE SET hold_token = excluded.hold_token, expires_at = excluded.expires_at
+            ''', [(showing_id, seat_id, hold_token, now + ttl) for seat_id in seats])
+            journal.append(conn.cursor(), [(journal.RESERVED, showing_id, state[0], None, hold_token, seats, 0)])
+        return now + ttl
+
+    def release_holds(self, showing_id, seats, hold_token):
+        with self.transaction() as conn:
+            released = conn.executemany("DELETE FROM seat_holds WHERE showing_id = ? AND seat_id = ? AND hold_token = ?",
+                                        [(showing_id, seat_id, hold_token) for seat_id in seats]).rowcount
+            if released:
+                journal.append(conn.cursor(), [(journal.RELEASED, showing_id, None, None, hold_token, seats, 0)])
+
+    def get_held_seats(self, showing_id, exclude_token=None):
+        rows = self.execute("SELECT seat_id FROM seat_holds WHERE showing_id = ? AND expires_at > ? AND hold_token IS NOT ?",
+                            (showing_id, time.time(), exclude_token))
+        return {seat_id for seat_id, in rows}
+
+    def sweep_expired_holds(self):
+        # Drop every expired hold in one statement; returns how many were removed
+        with self.transaction() as conn:
+            return conn.execute("DELETE FROM seat_holds WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    # Bookings
+
+    def insert_booking(self, showing_id, name, phone, email, seats, total_amount, booking_date, hold_token=None):
+        # Reserve the seats and record the booking in one write transaction.
+        # BEGIN IMMEDIATE takes the write lock up front, so two terminals
+        # booking at once are serialized instead of both reading stale state.
+        # Seats held by another customer are refused; the caller's own holds
+        # (matching hold_token) are consumed.
+        with self.transaction(immediate=True) as conn:
+            state = self._seat_state(conn, showing_id)
+            if state is None:
+                raise SeatUnavailableError(list(seats))
+            movie_id, index, bitmap = state
+
+            taken = self._unavailable_seats(conn, showing_id, index, bitmap, seats, hold_token, time.time())
+            if taken:
+                raise SeatUnavailableError(taken)
+
+            # Mark the seats sold and update available seats of the showing,
+            # refusing to go below zero, and the movie-wide count shown on the
+            # movie cards
+            bitmap.set(index.positions_of(seats))
+            cursor = conn.execute('''
+                UPDATE showings SET available_seats = available_seats - ?, seat_bitmap = ?
+                WHERE id = ? AND available_seats >= ?
+            ''', (len(seats), bitmap.to_bytes(), showing_id, len(seats)))
+            if cursor.rowcount != 1:
+                raise SeatUnavailableError(list(seats))
+            conn.execute("UPDATE movies SET available_seats = available_seats - ? WHERE id = ?", (len(seats), movie_id))
+
+            # Insert booking
+            cursor = conn.execute('''
+                INSERT INTO bookings (movie_id, showing_id, customer_name, phone, email, seats, total_amount, booking_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (movie_id, showing_id, name, phone, email, ','.join(seats), total_amount, booking_date))
+            booking_id = cursor.lastrowid
+
+            # Claim each seat; the unique constraint rejects anything sold meanwhile
+            try:
+                conn.executemany(
+                    "INSERT INTO seat_inventory (showing_id, seat_id, status, booking_id) VALUES (?, ?, 'booked', ?)",
+                    [(showing_id, seat_id, booking_id) for seat_id in seats])
+            except sqlite3.IntegrityError:
+                raise SeatUnavailableError(list(seats))
+
+            conn.executemany("DELETE FROM seat_holds WHERE showing_id = ? AND seat_id = ?",
+                             [(showing_id, seat_id) for seat_id in seats])
+            journal.append(conn.cursor(), [(journal.CONFIRMED, showing_id, movie_id, booking_id, hold_token,
+                                            seats, total_amount)])
+            return booking_id
+
+    def cancel_booking(self, booking_id):
+        # Give the booking's seats back and mark it cancelled; the sales
+        # triggers take it out of the figures. The row stays, so its id is
+        # never given to another booking. Returns (showing_id, seats,
+        # total_amount), or None if there is no such booking; raises
+        # BookingCancelledError if it was cancelled before.
+        with self.transaction(immediate=True) as conn:
+            row = conn.execute("SELECT movie_id, showing_id, seats, total_amount, cancelled_at FROM bookings WHERE id = ?",
+                               (booking_id,)).fetchone()
+            if not row:
+                return None
+            movie_id, showing_id, seats, total_amount, cancelled_at = row
+            if cancelled_at is not None:
+                raise BookingCancelledError(booking_id)
+            seats = [seat.strip() for seat in (seats or '').split(',') if seat.strip()]
+
+            state = self._seat_state(conn, showing_id) if showing_id is not None else None
+            if state is not None:
+                _, index, bitmap = state
+                bitmap.clear(index.positions_of([seat_id for seat_id in seats if seat_id in index]))
+                conn.execute("UPDATE showings SET available_seats = available_seats + ?, seat_bitmap = ? WHERE id = ?",
+                             (len(seats), bitmap.to_bytes(), showing_id))
+                conn.execute("UPDATE movies SET available_seats = available_seats + ? WHERE id = ?", (len(seats), movie_id))
+                conn.executemany("DELETE FROM seat_inventory WHERE showing_id = ? AND seat_id = ? AND booking_id = ?",
+                                 [(showing_id, seat_id, booking_id) for seat_id in seats])
+
+            conn.execute("UPDATE bookings SET cancelled_at = ? WHERE id = ?",
+                         (time.strftime("%Y-%m-%d %H:%M:%S"), booking_id))
+            journal.append(conn.cursor(), [(journal.CANCELLED, showing_id, movie_id, booking_id, None, seats,
+                                            total_amount or 0)])
+            return showing_id, seats, total_amount
+
+    def fetch_bookings_page(self, limit, after=None, movie_id=None, start=None, end=None, phone=None, email=None):
+        # Newest bookings first, one page at a time. Keyset pagination: `after`
+        # is the (booking_date, id) of the last row of the previous page, so
+        # every page is an index range scan however deep the user scrolls.
+        # start and end bound booking_date (start inclusive, end exclusive).
+        conditions, params = [f"b.{migrations.LIVE_BOOKINGS}"], []
+        for sql, value in (("b.movie_id = ?", movie_id), ("b.phone = ?", phone), ("b.email = ?", email),
+                           ("b.booking_date >= ?", start), ("b.booking_date < ?", end)):
+            if value is not None:
+                conditions.append(sql)
+                params.append(value)
+        if after is not None:
+            conditions.append("(b.booking_date, b.id) < (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}"
+        return self.execute(f'''
+            SELECT b.id, b.booking_date, b.movie_id, m.title, s.start_time, b.customer_name, b.phone,
+                   b.email, b.seats, b.total_amount
+            FROM bookings b
+            LEFT JOIN movies m ON m.id = b.movie_id
+            LEFT JOIN showings s ON s.id = b.showing_id
+            {where}
+            ORDER BY b.booking_date DESC, b.id DESC
+            LIMIT ?
+        ''', (*params, limit)).fetchall()
+
+    def iter_bookings(self):
+        # Every booking that was not cancelled with its movie title, streamed
+        # a page of rows at a time
+        cursor = self.connection().cursor()
+        cursor.execute(f'''
+            SELECT b.id, b.movie_id, m.title, b.showing_id, s.start_time, b.customer_name, b.phone,
+                   b.email, b.seats, b.total_amount, b.booking_date
+            FROM bookings b
+            LEFT JOIN movies m ON m.id = b.movie_id
+            LEFT JOIN showings s ON s.id = b.showing_id
+            WHERE b.{migrations.LIVE_BOOKINGS}
+            ORDER BY b.id
+        ''')
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+
+    # Sales figures come from sales_totals, which triggers on bookings keep
+    # current, so these read one row per movie however many bookings exist
+
+    def total_sales(self):
+        return self.execute("SELECT SUM(revenue) FROM sales_totals").fetchone()[0] or 0
+
+    def movie_purchases(self):
+        return self.execute('''
+            SELECT m.title, SUM(s.bookings)
+            FROM sales_totals s
+            JOIN movies m ON s.movie_id = m.id
+            WHERE s.bookings > 0
+            GROUP BY m.title
+        ''').fetchall()
+
+    def daily_sales(self, start_day, end_day):
+        return self.execute('''
+            SELECT day, movie_id, bookings, tickets, revenue
+            FROM sales_daily WHERE day >= ? AND day <= ?
+            ORDER BY day, movie_id
+        ''', (start_day, end_day)).fetchall()
+
+    def rebuild_sales_summary(self):
+        with self.transaction(immediate=True) as conn:
+            migrations.rebuild_sales_summary(conn.cursor())
+
+    # Booking journal
+
+    def snapshot_journal(self, only_if_due=False):
+        # Snapshot the seat and sales state; with only_if_due, only once
+        # enough events have been added since the last one. Returns the seq
+        # the snapshot covers, or None if none was taken.
+        cursor = self.connection().cursor()
+        if only_if_due and not journal.snapshot_due(cursor):
+            return None
+        with self.transaction(immediate=True) as conn:
+            return journal.take_snapshot(conn.cursor())
+
+    def replay_journal(self):
+        # Rebuild seat and sales state from the latest snapshot and the events
+        # since: bitmaps, available seats and sales totals from the journal,
+        # then the seat inventory and daily sales of the showings and days
+        # those events touched from their bookings. Returns the number of
+        # events replayed.
+        with self.transaction(immediate=True) as conn:
+            cursor = conn.cursor()
+            replayed, showing_ids, booking_ids = journal.replay(cursor)
+            migrations.rebuild_seat_inventory(cursor, showing_ids)
+            migrations.rebuild_sales_days(cursor, booking_ids)
+            return replayed
+
+    def journal_status(self):
+        cursor = self.connection().cursor()
+        return journal.last_seq(cursor), journal.last_snapshot(cursor)
+    # Admin
+
+    def check_admin(self, username, password):
+        row = self.execute("SELECT * FROM admin WHERE username = ? AND password = ?", (username, password)).fetchone()
+        return row is not None
+
+
+# Every query method shows up in the metrics as db.<method>
+metrics.instrument(Database, 'db', exclude=('connection', 'transaction', 'savepoint', 'execute', 'close'))
+
+
+_default_db = None
+_default_lock = threading.Lock()
+
+
+def get_db():
+    global _default_db
+    if _default_db is None:
+        with _default_lock:
+            if _default_db is None:
+                _default_db = Database(DEFAULT_DB_PATH)
+    return _default_db
+
+
+def configure(path):
+    # Point the shared database at another file, closing any open handles
+    global _default_db
+    with _default_lock:
+        if _default_db is not None:
+            _default_db.close()
+        _default_db = Database(path)
+    return _default_db
+
+
+def setup_database():
+    get_db().setup()
@@ -0,0 +1,146 @@
+import time
+import seatmap
+
+# Append-only journal of booking events. Every hold, release, booking and
+# cancellation appends one row to booking_events in the same transaction
+# as the change itself, so the journal and the tables derived from it
+# (showing seat bitmaps and available seats, movie available seats, sales
+# totals) can never disagree after a crash. Rows are only ever added, with
+# increasing seq, so each write lands at the end of the table; a batch from
+# the group-commit writer appends all its events in one transaction.
+#
+# A snapshot copies the derived state at some seq. replay() rebuilds the
+# derived tables from the latest snapshot plus the events after it, so a
+# repair reads the tail of the journal instead of every booking ever made.
+# setup() takes a new snapshot on startup once the tail grows past
+# SNAPSHOT_EVERY events.
+#
+# Holds that run out are dropped by the sweeper without an event; a
+# 'reserved' event is followed by 'released', 'confirmed' or nothing. Holds
+# are therefore not replayed: replay leaves seat_holds as it is, and holds
+# only last minutes anyway.
+
+RESERVED = 'reserved'
+RELEASED = 'released'
+CONFIRMED = 'confirmed'
+CANCELLED = 'cancelled'
+
+# Events after the latest snapshot that make startup take a new one
+SNAPSHOT_EVERY = 10000
+
+# Snapshots kept; older ones are deleted when a new one is taken
+SNAPSHOTS_KEPT = 2
+
+
+def append(cursor, events):
+    # events: (kind, showing_id, movie_id, booking_id, hold_token, seats, amount)
+    now = time.time()
+    cursor.executemany('''
+        INSERT INTO booking_events (kind, showing_id, movie_id, booking_id, hold_token, seats, amount, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(kind, showing_id, movie_id, booking_id, hold_token, ','.join(seats), amount, now)
+          for kind, showing_id, movie_id, booking_id, hold_token, seats, amount in events])
+
+
+def last_seq(cursor):
+    return cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM booking_events").fetchone()[0]
+
+
+def last_snapshot(cursor):
+    # seq covered by the latest snapshot, or None if there is none
+    return cursor.execute("SELECT MAX(seq) FROM journal_snapshots").fetchone()[0]
+
+
+def snapshot_due(cursor):
+    snapshot = last_snapshot(cursor)
+    return snapshot is None or last_seq(cursor) - snapshot >= SNAPSHOT_EVERY
+
+
+def take_snapshot(cursor):
+    # Copy the current derived state, labelled with the last event it includes
+    seq = last_seq(cursor)
+    cursor.execute("INSERT OR REPLACE INTO journal_snapshots (seq, created_at) VALUES (?, ?)", (seq, time.time()))
+    cursor.execute("DELETE FROM snapshot_showings WHERE snapshot_seq = ?", (seq,))
+    cursor.execute("DELETE FROM snapshot_sales WHERE snapshot_seq = ?", (seq,))
+    cursor.execute('''
+        INSERT INTO snapshot_showings (snapshot_seq, showing_id, seat_bitmap, available_seats)
+        SELECT ?, id, seat_bitmap, available_seats FROM showings
+    ''', (seq,))
+    cursor.execute('''
+        INSERT INTO snapshot_sales (snapshot_seq, movie_id, bookings, tickets, revenue)
+        SELECT ?, movie_id, bookings, tickets, revenue FROM sales_totals
+    ''', (seq,))
+
+    # Drop the snapshots that fell out of the kept window
+    oldest = cursor.execute("SELECT seq FROM journal_snapshots ORDER BY seq DESC LIMIT 1 OFFSET ?",
+                            (SNAPSHOTS_KEPT - 1,)).fetchone()
+    if oldest:
+        cursor.execute("DELETE FROM snapshot_showings WHERE snapshot_seq < ?", oldest)
+        cursor.execute("DELETE FROM snapshot_sales WHERE snapshot_seq < ?", oldest)
+        cursor.execute("DELETE FROM journal_snapshots WHERE seq < ?", oldest)
+    return seq
+
+
+def replay(cursor):
+    # Rebuild showing bitmaps and available seats, movie available seats
+    # and sales_totals from the latest snapshot and the events after it.
+    # Showings added since the snapshot start empty. Returns the number of
+    # events replayed and the showing and booking ids they touched, whose
+    # seat inventory and daily sales the caller rebuilds from those
+    # bookings (see Database.replay_journal).
+    snapshot = last_snapshot(cursor) or 0
+
+    showings = {}
+    indexes = {}
+    for showing_id, movie_id, layout, data, available in cursor.execute('''
+            SELECT s.id, s.movie_id, c.layout, p.seat_bitmap, p.available_seats
+            FROM showings s
+            JOIN screens c ON c.id = s.screen_id
+            LEFT JOIN snapshot_showings p ON p.snapshot_seq = ? AND p.showing_id = s.id
+    ''', (snapshot,)).fetchall():
+        index = indexes.get(layout)
+        if index is None:
+            index = indexes[layout] = seatmap.seat_index(layout)
+        bitmap = seatmap.SeatBitmap(len(index), data)
+        showings[showing_id] = [movie_id, index, bitmap, len(index) if available is None else available]
+
+    sales = {movie_id: [bookings, tickets, revenue] for movie_id, bookings, tickets, revenue in cursor.execute(
+        "SELECT movie_id, bookings, tickets, revenue FROM snapshot_sales WHERE snapshot_seq = ?", (snapshot,))}
+
+    replayed = 0
+    showing_ids, booking_ids = set(), set()
+    for kind, showing_id, movie_id, booking_id, seats, amount in cursor.execute('''
+            SELECT kind, showing_id, movie_id, booking_id, seats, amount FROM booking_events
+            WHERE seq > ? AND kind IN (?, ?) ORDER BY seq
+    ''', (snapshot, CONFIRMED, CANCELLED)):
+        replayed += 1
+        showing_ids.add(showing_id)
+        booking_ids.add(booking_id)
+        seats = seats.split(',') if seats else []
+        sign = 1 if kind == CONFIRMED else -1
+        totals = sales.setdefault(movie_id or 0, [0, 0, 0.0])
+        totals[0] += sign
+        totals[1] += sign * len(seats)
+        totals[2] = round(totals[2] + sign * amount, 2)
+        state = showings.get(showing_id)
+        if state is None:
+            continue  # Showing deleted since
+        index, bitmap = state[1], state[2]
+        positions = index.positions_of([seat for seat in seats if seat in index])
+        if sign > 0:
+            bitmap.set(positions)
+        else:
+            bitmap.clear(positions)
+        state[3] -= sign * len(seats)
+
+    cursor.executemany("UPDATE showings SET seat_bitmap = ?, available_seats = ? WHERE id = ?",
+                       [(bitmap.to_bytes(), available, showing_id)
+                        for showing_id, (movie_id, index, bitmap, available) in showings.items()])
+    cursor.execute('''
+        UPDATE movies SET available_seats = COALESCE(
+            (SELECT SUM(available_seats) FROM showings WHERE movie_id = movies.id), 0)
+    ''')
+    cursor.execute("DELETE FROM sales_totals")
+    cursor.executemany("INSERT INTO sales_totals (movie_id, bookings, tickets, revenue) VALUES (?, ?, ?, ?)",
+                       [(movie_id, *totals) for movie_id, totals in sales.items()])
+    return replayed, showing_ids, booking_ids
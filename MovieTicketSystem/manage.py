@@ -0,0 +1,228 @@
+import argparse
+import sys
+import database
+import migrations
+import booking_service
+import catalog_io
+import venues
+from booking_service import BookingError
+
+# Maintenance commands for the booking database.
+#
+#   python manage.py migrate          apply pending schema migrations
+#   python manage.py check-plans      verify hot queries use their indexes
+#   python manage.py rebuild-sales    recompute the dashboard sales tables
+#   python manage.py rebuild-seatmaps recompute the sold-seat bitmaps of showings
+#   python manage.py rebuild-search   recompute the movie search index and facets
+#   python manage.py screens          list screens and their seat layouts
+#   python manage.py add-screen NAME LAYOUT_FILE
+#   python manage.py add-showing MOVIE_ID SCREEN_ID "YYYY-MM-DD HH:MM"
+#   python manage.py import-catalog MANIFEST [--posters DIR]
+#   python manage.py export-catalog OUT.csv|OUT.jsonl [--posters DIR]
+#   python manage.py export-bookings OUT.csv|OUT.jsonl
+#   python manage.py cancel-booking BOOKING_ID
+#   python manage.py snapshot        snapshot seat and sales state in the booking journal
+#   python manage.py replay-journal  rebuild seat and sales state from the last snapshot
+#
+# With --venues DIR --venue ID (or MOVIE_BOOKING_VENUES / MOVIE_BOOKING_VENUE)
+# commands run on that venue's database; `migrate` creates a new venue.
+
+
+def cmd_migrate(db, args):
+    with db.transaction(immediate=True) as conn:
+        applied = migrations.migrate(conn)
+    if applied:
+        print(f"Applied migrations: {', '.join(map(str, applied))}")
+    else:
+        print(f"Schema is up to date (version {migrations.LATEST_VERSION})")
+    return 0
+
+
+def cmd_check_plans(db, args):
+    conn = db.connection()
+    failures = migrations.check_query_plans(conn)
+    for sql, plan in failures:
+        print(f"Index not used by: {' '.join(sql.split())}")
+        for step in plan:
+            print(f"    {step}")
+    if failures:
+        return 1
+    print(f"All {len(migrations.EXPECTED_PLANS)} queries use their indexes")
+    return 0
+
+
+def cmd_rebuild_sales(db, args):
+    db.rebuild_sales_summary()
+    print(f"Sales summary rebuilt: total sales ${db.total_sales():.2f}")
+    return 0
+
+
+def cmd_rebuild_seatmaps(db, args):
+    db.rebuild_seat_bitmaps()
+    print("Seat bitmaps rebuilt from the seat inventory")
+    return 0
+
+
+def cmd_rebuild_search(db, args):
+    db.rebuild_movie_search()
+    print("Movie search index and facets rebuilt")
+    return 0
+
+
+def cmd_screens(db, args):
+    for screen_id, name, layout in db.list_screens():
+        print(f"{screen_id}: {name}")
+        for line in layout.splitlines():
+            print(f"    {line}")
+    return 0
+
+
+def cmd_add_screen(db, args):
+    with open(args.layout_file) as f:
+        layout = f.read()
+    try:
+        screen_id = booking_service.add_screen(args.name, layout, db=db)
+    except BookingError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Added screen {screen_id}")
+    return 0
+
+
+def cmd_add_showing(db, args):
+    try:
+        showing_id = booking_service.add_showing(args.movie_id, args.screen_id, args.start_time, db=db)
+    except BookingError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Added showing {showing_id}")
+    return 0
+
+
+def cmd_import_catalog(db, args):
+    imported, errors = catalog_io.import_catalog(args.manifest, args.posters, args.batch_size, args.workers, db=db)
+    for line_num, error in errors:
+        print(f"Skipped line {line_num}: {error}")
+    print(f"Imported {imported} movies")
+    return 1 if errors else 0
+
+
+def cmd_export_catalog(db, args):
+    try:
+        count = catalog_io.export_catalog(args.out, args.posters, db=db)
+    except BookingError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Exported {count} movies")
+    return 0
+
+
+def cmd_export_bookings(db, args):
+    try:
+        count = catalog_io.export_bookings(args.out, db=db)
+    except BookingError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Exported {count} bookings")
+    return 0
+
+
+def cmd_cancel_booking(db, args):
+    try:
+        booking = booking_service.cancel_booking(args.booking_id, db=db)
+    except BookingError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Cancelled booking {booking['id']}: seats {', '.join(booking['seats'])}, refund {booking['refund']:.2f}")
+    return 0
+
+
+def cmd_snapshot(db, args):
+    seq = db.snapshot_journal()
+    print(f"Snapshot taken at event {seq}")
+    return 0
+
+
+def cmd_replay_journal(db, args):
+    last, snapshot = db.journal_status()
+    replayed = db.replay_journal()
+    print(f"Replayed {replayed} bookings and cancellations after the snapshot at event {snapshot or 0} "
+          f"(journal ends at {last})")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Movie booking database maintenance")
+    parser.add_argument('--db', default=database.DEFAULT_DB_PATH, help="SQLite database file")
+    parser.add_argument('--venues', default=venues.VENUES_DIR, help="directory of per-venue databases")
+    parser.add_argument('--venue', default=venues.LOCAL_VENUE, help="venue to work on (with --venues)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('migrate', help="apply pending schema migrations").set_defaults(func=cmd_migrate)
+    commands.add_parser('check-plans', help="verify hot queries use their indexes").set_defaults(func=cmd_check_plans)
+    commands.add_parser('rebuild-sales', help="recompute the dashboard sales tables").set_defaults(func=cmd_rebuild_sales)
+    commands.add_parser('rebuild-seatmaps', help="recompute the sold-seat bitmaps of showings").set_defaults(func=cmd_rebuild_seatmaps)
+    commands.add_parser('rebuild-search', help="recompute the movie search index and facets").set_defaults(func=cmd_rebuild_search)
+    commands.add_parser('screens', help="list screens").set_defaults(func=cmd_screens)
+
+    add_screen = commands.add_parser('add-screen', help="add a screen from a layout file")
+    add_screen.add_argument('name')
+    add_screen.add_argument('layout_file', help="one line per row, 'S' for a seat and '.' for a gap")
+    add_screen.set_defaults(func=cmd_add_screen)
+
+    add_showing = commands.add_parser('add-showing', help="schedule a movie on a screen")
+    add_showing.add_argument('movie_id', type=int)
+    add_showing.add_argument('screen_id', type=int)
+    add_showing.add_argument('start_time', help="YYYY-MM-DD HH:MM")
+    add_showing.set_defaults(func=cmd_add_showing)
+
+    import_catalog = commands.add_parser('import-catalog', help="bulk import movies from a manifest")
+    import_catalog.add_argument('manifest', help=".csv, .jsonl or .json file")
+    import_catalog.add_argument('--posters', help="poster directory (default: next to the manifest)")
+    import_catalog.add_argument('--batch-size', type=int, default=catalog_io.IMPORT_BATCH_SIZE)
+    import_catalog.add_argument('--workers', type=int, help="poster resizing processes")
+    import_catalog.set_defaults(func=cmd_import_catalog)
+
+    export_catalog = commands.add_parser('export-catalog', help="write the catalog as an import manifest")
+    export_catalog.add_argument('out', help=".csv or .jsonl file")
+    export_catalog.add_argument('--posters', help="directory to write posters to")
+    export_catalog.set_defaults(func=cmd_export_catalog)
+
+    export_bookings = commands.add_parser('export-bookings', help="write all bookings to a file")
+    export_bookings.add_argument('out', help=".csv or .jsonl file")
+    export_bookings.set_defaults(func=cmd_export_bookings)
+
+    cancel_booking = commands.add_parser('cancel-booking', help="cancel a booking and free its seats")
+    cancel_booking.add_argument('booking_id', type=int)
+    cancel_booking.set_defaults(func=cmd_cancel_booking)
+
+    commands.add_parser('snapshot', help="snapshot seat and sales state in the booking journal").set_defaults(func=cmd_snapshot)
+    commands.add_parser('replay-journal', help="rebuild seat and sales state from the booking journal").set_defaults(func=cmd_replay_journal)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.venues:
+        if not args.venue:
+            print("Error: --venue is required with --venues")
+            return 1
+        try:
+            venues.configure(args.venues, args.venue)
+        except BookingError as e:
+            print(f"Error: {e}")
+            return 1
+        db = database.get_db()
+    else:
+        db = database.configure(args.db)
+    try:
+        if args.func is not cmd_migrate:
+            db.setup()
+        return args.func(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
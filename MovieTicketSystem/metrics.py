@@ -0,0 +1,205 @@
+import atexit
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+import types
+
+# In-process timings and counters, so a slow terminal can tell where the time
+# goes. Latencies are kept in histograms with fixed buckets (no samples are
+# stored, so recording costs the same however long the app runs) and can be
+# written out as Prometheus text or JSON.
+#
+#   with metrics.timed('db.rebuild'):     time a block
+#   @metrics.timed('ui.show_page')        time every call of a function
+#   metrics.increment('db.busy_waits')    count an event
+#
+# Environment:
+#   MOVIE_BOOKING_METRICS=FILE   write metrics to FILE (.json for JSON, anything
+#                                else Prometheus text) periodically and at exit
+#   MOVIE_BOOKING_PROFILE=FILE   capture a cProfile of the main thread into FILE
+
+METRICS_PATH = os.environ.get('MOVIE_BOOKING_METRICS')
+PROFILE_PATH = os.environ.get('MOVIE_BOOKING_PROFILE')
+
+# Upper bounds of the latency buckets in milliseconds
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Prefix of the exported Prometheus metric names
+PROMETHEUS_PREFIX = 'movie_booking'
+
+# Code flag of generator functions (inspect.CO_GENERATOR; inspect itself is
+# slow to import and this module loads on every start)
+CO_GENERATOR = 0x20
+
+
+class Histogram:
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last bucket is everything above the bounds
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th value, capped at the max
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_profiler = None
+
+
+def observe(name, seconds):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds * 1000)
+
+
+def increment(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+class Timer:
+    # Context manager and decorator recording elapsed time under `name`
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+
+    def __call__(self, func):
+        name = self.name
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start)
+        return wrapper
+
+
+def timed(name):
+    return Timer(name)
+
+
+def instrument(cls, prefix, exclude=()):
+    # Time every public method of cls as '<prefix>.<method>'. Generators are
+    # left alone: only creating them would be timed.
+    for name, func in list(vars(cls).items()):
+        if (name.startswith('_') or name in exclude or not isinstance(func, types.FunctionType)
+                or func.__code__.co_flags & CO_GENERATOR):
+            continue
+        setattr(cls, name, timed(f'{prefix}.{name}')(func))
+    return cls
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+# Export
+
+def snapshot():
+    with _lock:
+        histograms = {name: {
+            'count': h.count,
+            'sum_ms': h.total,
+            'max_ms': h.max,
+            'p50_ms': h.quantile(0.5),
+            'p95_ms': h.quantile(0.95),
+            'p99_ms': h.quantile(0.99),
+            'buckets': dict(zip([str(bound) for bound in h.bounds] + ['+Inf'], h.counts)),
+        } for name, h in sorted(_histograms.items())}
+        return {'counters': dict(sorted(_counters.items())), 'histograms': histograms}
+
+
+def to_prometheus():
+    # Text exposition format: one latency histogram in seconds and one event
+    # counter, each labelled with the metric name
+    latency = f'{PROMETHEUS_PREFIX}_latency_seconds'
+    events = f'{PROMETHEUS_PREFIX}_events_total'
+    lines = [f'# TYPE {latency} histogram']
+    with _lock:
+        for name, h in sorted(_histograms.items()):
+            cumulative = 0
+            for bound, count in zip(h.bounds, h.counts):
+                cumulative += count
+                lines.append(f'{latency}_bucket{{name="{name}",le="{bound / 1000:g}"}} {cumulative}')
+            lines.append(f'{latency}_bucket{{name="{name}",le="+Inf"}} {h.count}')
+            lines.append(f'{latency}_sum{{name="{name}"}} {h.total / 1000:.6f}')
+            lines.append(f'{latency}_count{{name="{name}"}} {h.count}')
+        lines.append(f'# TYPE {events} counter')
+        for name, value in sorted(_counters.items()):
+            lines.append(f'{events}{{name="{name}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def dump(path):
+    # Written to a temporary file and renamed, so a collector reading the
+    # file never sees half of it
+    text = json.dumps(snapshot(), indent=2) if path.endswith('.json') else to_prometheus()
+    temp = f'{path}.tmp'
+    with open(temp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp, path)
+
+
+# Profiling
+
+def start_profile():
+    # cProfile only sees the thread that enabled it, here the caller's
+    # (the Tk main thread in the app); worker threads show up in the timings
+    global _profiler
+    if _profiler is None:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def stop_profile(path):
+    global _profiler
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(path)
+        _profiler = None
+
+
+def enable_from_environment():
+    # Start the profiler and write metrics and profile at exit as the
+    # environment asks
+    if PROFILE_PATH:
+        start_profile()
+        atexit.register(stop_profile, PROFILE_PATH)
+    if METRICS_PATH:
+        atexit.register(dump, METRICS_PATH)
@@ -0,0 +1,569 @@
+import datetime
+import hashlib
+import sqlite3
+import journal
+import seat_layouts
+import seatmap
+
+# Versioned schema migrations. Each migration runs once, in order, inside the
+# caller's transaction and is recorded in schema_migrations. The early steps
+# use IF NOT EXISTS so databases created before migrations existed are adopted
+# as-is. Add new steps at the end of MIGRATIONS; never edit an applied one.
+
+
+def create_base_tables(cursor):
+    # Create Movies table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS movies (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        description TEXT,
+        language TEXT,
+        duration TEXT,
+        release_date TEXT,
+        genre TEXT,
+        total_seats INTEGER,
+        available_seats INTEGER,
+        price REAL,
+        image BLOB
+    )
+    ''')
+
+    # Create Bookings table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS bookings (
+        id INTEGER PRIMARY KEY,
+        movie_id INTEGER,
+        customer_name TEXT,
+        phone TEXT,
+        email TEXT,
+        seats TEXT,
+        total_amount REAL,
+        booking_date TEXT,
+        FOREIGN KEY (movie_id) REFERENCES movies (id)
+    )
+    ''')
+
+    # Create Admin table
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS admin (
+        id INTEGER PRIMARY KEY,
+        username TEXT UNIQUE,
+        password TEXT
+    )
+    ''')
+
+
+def create_seat_inventory(cursor):
+    # Create Seat Inventory table: one row per sold seat. The unique
+    # constraint is what makes double-selling a seat impossible.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS seat_inventory (
+        id INTEGER PRIMARY KEY,
+        movie_id INTEGER NOT NULL,
+        seat_id TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'booked',
+        booking_id INTEGER,
+        UNIQUE (movie_id, seat_id),
+        FOREIGN KEY (movie_id) REFERENCES movies (id),
+        FOREIGN KEY (booking_id) REFERENCES bookings (id)
+    )
+    ''')
+
+    # Carry seats of bookings made before the inventory existed over
+    cursor.execute("SELECT 1 FROM seat_inventory LIMIT 1")
+    if not cursor.fetchone():
+        legacy = cursor.execute("SELECT id, movie_id, seats FROM bookings WHERE seats IS NOT NULL").fetchall()
+        cursor.executemany(
+            "INSERT OR IGNORE INTO seat_inventory (movie_id, seat_id, status, booking_id) VALUES (?, ?, 'booked', ?)",
+            [(movie_id, seat.strip(), booking_id)
+             for booking_id, movie_id, seats in legacy
+             for seat in seats.split(',') if seat.strip()])
+
+
+def add_booking_indexes(cursor):
+    # Lookups by movie, date range and customer contact details
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_movie_id ON bookings (movie_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_booking_date ON bookings (booking_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_phone ON bookings (phone)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_email ON bookings (email)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_seat_inventory_booking_id ON seat_inventory (booking_id)")
+    cursor.execute("ANALYZE")
+
+
+# Bookings that count towards sales, seats and reports; cancelled ones keep
+# their row (see add_booking_cancellations)
+LIVE_BOOKINGS = "cancelled_at IS NULL"
+
+# Number of seats in a comma-separated bookings.seats value
+TICKETS_SQL = "CASE WHEN {0} IS NULL OR {0} = '' THEN 0 ELSE length({0}) - length(replace({0}, ',', '')) + 1 END"
+
+
+def sales_trigger_body(row, sign):
+    # Statements adding (sign=1) or removing (sign=-1) one booking row from
+    # the per-day and per-movie sales tables
+    movie_id = f"COALESCE({row}.movie_id, 0)"
+    day = f"COALESCE(substr({row}.booking_date, 1, 10), '')"
+    tickets = f"{sign} * ({TICKETS_SQL.format(row + '.seats')})"
+    revenue = f"{sign} * COALESCE({row}.total_amount, 0)"
+    return f'''
+        INSERT INTO sales_daily (movie_id, day, bookings, tickets, revenue)
+        VALUES ({movie_id}, {day}, {sign}, {tickets}, {revenue})
+        ON CONFLICT (movie_id, day) DO UPDATE SET
+            bookings = bookings + excluded.bookings,
+            tickets = tickets + excluded.tickets,
+            revenue = round(revenue + excluded.revenue, 2);
+        INSERT INTO sales_totals (movie_id, bookings, tickets, revenue)
+        VALUES ({movie_id}, {sign}, {tickets}, {revenue})
+        ON CONFLICT (movie_id) DO UPDATE SET
+            bookings = bookings + excluded.bookings,
+            tickets = tickets + excluded.tickets,
+            revenue = round(revenue + excluded.revenue, 2);
+    '''
+
+
+def create_sales_summary(cursor):
+    # Sales per movie per day, and per movie overall, kept current by
+    # triggers on bookings so the dashboard never aggregates bookings itself
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sales_daily (
+        movie_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        bookings INTEGER NOT NULL DEFAULT 0,
+        tickets INTEGER NOT NULL DEFAULT 0,
+        revenue REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (movie_id, day)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sales_totals (
+        movie_id INTEGER PRIMARY KEY,
+        bookings INTEGER NOT NULL DEFAULT 0,
+        tickets INTEGER NOT NULL DEFAULT 0,
+        revenue REAL NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_daily_day ON sales_daily (day)")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_bookings_sales_insert AFTER INSERT ON bookings BEGIN {sales_trigger_body('NEW', 1)} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_bookings_sales_delete AFTER DELETE ON bookings BEGIN {sales_trigger_body('OLD', -1)} END")
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_bookings_sales_update
+        AFTER UPDATE OF movie_id, seats, total_amount, booking_date ON bookings
+        BEGIN {sales_trigger_body('OLD', -1)} {sales_trigger_body('NEW', 1)} END''')
+    rebuild_sales_summary(cursor, live='1')  # No cancellations before migration 12
+
+
+def rebuild_sales_summary(cursor, live=LIVE_BOOKINGS):
+    # Recompute both sales tables from the bookings table
+    tickets = TICKETS_SQL.format('seats')
+    cursor.execute("DELETE FROM sales_daily")
+    cursor.execute("DELETE FROM sales_totals")
+    cursor.execute(f'''
+        INSERT INTO sales_daily (movie_id, day, bookings, tickets, revenue)
+        SELECT COALESCE(movie_id, 0), COALESCE(substr(booking_date, 1, 10), ''), COUNT(*), SUM({tickets}), round(SUM(COALESCE(total_amount, 0)), 2)
+        FROM bookings WHERE {live} GROUP BY 1, 2
+    ''')
+    cursor.execute('''
+        INSERT INTO sales_totals (movie_id, bookings, tickets, revenue)
+        SELECT movie_id, SUM(bookings), SUM(tickets), round(SUM(revenue), 2) FROM sales_daily GROUP BY movie_id
+    ''')
+
+
+def rebuild_sales_days(cursor, booking_ids):
+    # Recompute the sales_daily rows of the movies and days of some bookings,
+    # reading only the bookings of those days (idx_bookings_movie_date)
+    days = set()
+    for booking_id in booking_ids:
+        row = cursor.execute("SELECT movie_id, substr(booking_date, 1, 10) FROM bookings WHERE id = ?",
+                             (booking_id,)).fetchone()
+        if row and row[0] is not None and row[1]:
+            days.add(row)
+    tickets = TICKETS_SQL.format('seats')
+    for movie_id, day in days:
+        cursor.execute("DELETE FROM sales_daily WHERE movie_id = ? AND day = ?", (movie_id, day))
+        cursor.execute(f'''
+            INSERT INTO sales_daily (movie_id, day, bookings, tickets, revenue)
+            SELECT ?, ?, COUNT(*), SUM({tickets}), round(SUM(COALESCE(total_amount, 0)), 2)
+            FROM bookings
+            WHERE movie_id = ? AND booking_date >= ? AND booking_date < date(?, '+1 day') AND {LIVE_BOOKINGS}
+            HAVING COUNT(*) > 0
+        ''', (movie_id, day, movie_id, day, day))
+
+
+def create_screens_and_showings(cursor):
+    # Screens with their seat layout, and showings of a movie on a screen.
+    # Seat inventory and bookings move from movies to showings.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS screens (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        layout TEXT NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS showings (
+        id INTEGER PRIMARY KEY,
+        movie_id INTEGER NOT NULL,
+        screen_id INTEGER NOT NULL,
+        start_time TEXT,
+        available_seats INTEGER NOT NULL,
+        FOREIGN KEY (movie_id) REFERENCES movies (id),
+        FOREIGN KEY (screen_id) REFERENCES screens (id)
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_showings_movie_id ON showings (movie_id, start_time)")
+
+    # Every existing movie gets one showing without a start time on a screen
+    # sized to its total_seats, which keeps its current bookings valid
+    screens = {}
+    for movie_id, total_seats, available_seats in cursor.execute(
+            "SELECT id, total_seats, available_seats FROM movies").fetchall():
+        layout = seat_layouts.default_layout(total_seats or 0)
+        if layout not in screens:
+            cursor.execute("INSERT INTO screens (name, layout) VALUES (?, ?)",
+                           (f"Screen {len(screens) + 1}", layout))
+            screens[layout] = cursor.lastrowid
+        cursor.execute("INSERT INTO showings (movie_id, screen_id, start_time, available_seats) VALUES (?, ?, NULL, ?)",
+                       (movie_id, screens[layout], available_seats or 0))
+
+    cursor.execute("ALTER TABLE bookings ADD COLUMN showing_id INTEGER REFERENCES showings (id)")
+    cursor.execute("UPDATE bookings SET showing_id = (SELECT s.id FROM showings s WHERE s.movie_id = bookings.movie_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_showing_id ON bookings (showing_id)")
+
+    # Re-key the seat inventory by showing
+    cursor.execute('''
+    CREATE TABLE seat_inventory_new (
+        id INTEGER PRIMARY KEY,
+        showing_id INTEGER NOT NULL,
+        seat_id TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'booked',
+        booking_id INTEGER,
+        UNIQUE (showing_id, seat_id),
+        FOREIGN KEY (showing_id) REFERENCES showings (id),
+        FOREIGN KEY (booking_id) REFERENCES bookings (id)
+    )
+    ''')
+    cursor.execute('''
+        INSERT INTO seat_inventory_new (id, showing_id, seat_id, status, booking_id)
+        SELECT i.id, s.id, i.seat_id, i.status, i.booking_id
+        FROM seat_inventory i JOIN showings s ON s.movie_id = i.movie_id
+    ''')
+    cursor.execute("DROP TABLE seat_inventory")
+    cursor.execute("ALTER TABLE seat_inventory_new RENAME TO seat_inventory")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_seat_inventory_booking_id ON seat_inventory (booking_id)")
+
+
+def create_seat_holds(cursor):
+    # Short-lived holds on seats a customer has selected but not yet paid for.
+    # expires_at is a Unix timestamp; the index lets the sweeper delete all
+    # expired holds with one range scan.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS seat_holds (
+        showing_id INTEGER NOT NULL,
+        seat_id TEXT NOT NULL,
+        hold_token TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        PRIMARY KEY (showing_id, seat_id),
+        FOREIGN KEY (showing_id) REFERENCES showings (id)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_seat_holds_expires_at ON seat_holds (expires_at)")
+
+
+def add_seat_bitmaps(cursor):
+    # Sold seats of each showing as a bitmap on the showing row, so seat maps
+    # and availability checks read one value instead of the seat inventory
+    cursor.execute("ALTER TABLE showings ADD COLUMN seat_bitmap BLOB")
+    rebuild_seat_bitmaps(cursor)
+
+
+def rebuild_seat_inventory(cursor, showing_ids):
+    # Rewrite the seat inventory of some showings from their live bookings
+    for showing_id in showing_ids:
+        cursor.execute("DELETE FROM seat_inventory WHERE showing_id = ?", (showing_id,))
+        cursor.executemany(
+            "INSERT OR IGNORE INTO seat_inventory (showing_id, seat_id, status, booking_id) VALUES (?, ?, 'booked', ?)",
+            [(showing_id, seat.strip(), booking_id)
+             for booking_id, seats in cursor.execute(
+                 f"SELECT id, seats FROM bookings WHERE showing_id = ? AND {LIVE_BOOKINGS}", (showing_id,)).fetchall()
+             for seat in (seats or '').split(',') if seat.strip()])
+
+
+def rebuild_seat_bitmaps(cursor):
+    # Recompute every showing's bitmap from the seat inventory
+    for showing_id, layout in cursor.execute(
+            "SELECT s.id, c.layout FROM showings s JOIN screens c ON c.id = s.screen_id").fetchall():
+        seats = [seat_id for seat_id, in cursor.execute(
+            "SELECT seat_id FROM seat_inventory WHERE showing_id = ? AND status = 'booked'", (showing_id,))]
+        bitmap = seatmap.bitmap_from_seats(seatmap.seat_index(layout), seats)
+        cursor.execute("UPDATE showings SET seat_bitmap = ? WHERE id = ?", (bitmap.to_bytes(), showing_id))
+
+
+def create_poster_store(cursor):
+    # Posters move out of the movies rows into a content-addressed table keyed
+    # by the SHA-256 of the card-size image, so identical posters are stored
+    # once and movie queries no longer drag poster bytes through the page
+    # cache. A poster can have several variants (resolutions); 'card' is the
+    # one shown on movie cards and always exists.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS posters (
+        id INTEGER PRIMARY KEY,
+        hash TEXT NOT NULL,
+        variant TEXT NOT NULL,
+        data BLOB NOT NULL,
+        UNIQUE (hash, variant)
+    )
+    ''')
+    cursor.execute("ALTER TABLE movies ADD COLUMN poster_hash TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movies_poster_hash ON movies (poster_hash)")
+
+    # One poster in memory at a time
+    for movie_id, in cursor.execute("SELECT id FROM movies WHERE image IS NOT NULL").fetchall():
+        data = cursor.execute("SELECT image FROM movies WHERE id = ?", (movie_id,)).fetchone()[0]
+        digest = hashlib.sha256(data).hexdigest()
+        cursor.execute("INSERT OR IGNORE INTO posters (hash, variant, data) VALUES (?, 'card', ?)", (digest, data))
+        cursor.execute("UPDATE movies SET poster_hash = ?, image = NULL WHERE id = ?", (digest, movie_id))
+
+    # DROP COLUMN needs SQLite 3.35; older versions keep the emptied column
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        cursor.execute("ALTER TABLE movies DROP COLUMN image")
+
+
+def add_booking_history_indexes(cursor):
+    # The bookings screen pages newest first by (booking_date, id). Filter
+    # columns get booking_date as a second key so a filtered page is one
+    # index range scan with no sort; SQLite appends the id itself.
+    for column in ('movie_id', 'phone', 'email'):
+        cursor.execute(f"DROP INDEX IF EXISTS idx_bookings_{column}")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_movie_date ON bookings (movie_id, booking_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_phone_date ON bookings (phone, booking_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_email_date ON bookings (email, booking_date)")
+    cursor.execute("ANALYZE bookings")
+
+
+def create_movie_search(cursor):
+    # Full-text index over title, description and genre. It is an external
+    # content table, so the text is not stored twice; triggers keep it in step
+    # with movies. The update trigger only fires for the indexed columns, not
+    # for the available_seats changes every booking makes.
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+        title, description, genre,
+        content='movies', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS movies_fts_insert AFTER INSERT ON movies BEGIN
+        INSERT INTO movies_fts (rowid, title, description, genre) VALUES (new.id, new.title, new.description, new.genre);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS movies_fts_delete AFTER DELETE ON movies BEGIN
+        INSERT INTO movies_fts (movies_fts, rowid, title, description, genre) VALUES ('delete', old.id, old.title, old.description, old.genre);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS movies_fts_update AFTER UPDATE OF title, description, genre ON movies BEGIN
+        INSERT INTO movies_fts (movies_fts, rowid, title, description, genre) VALUES ('delete', old.id, old.title, old.description, old.genre);
+        INSERT INTO movies_fts (rowid, title, description, genre) VALUES (new.id, new.title, new.description, new.genre);
+    END
+    ''')
+
+    # Genres and languages split out of the free-text columns, one row per
+    # movie and value, so filtering by genre is a primary key lookup
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS movie_facets (
+        kind TEXT NOT NULL,
+        value TEXT NOT NULL,
+        movie_id INTEGER NOT NULL,
+        PRIMARY KEY (kind, value, movie_id),
+        FOREIGN KEY (movie_id) REFERENCES movies (id)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movie_facets_movie_id ON movie_facets (movie_id)")
+    rebuild_movie_search(cursor)
+
+
+def movie_facets(genre, language):
+    # (kind, value) pairs of a movie: "Action, Adventure" is two genres.
+    # Values are case-folded so "drama" and "Drama" are one facet.
+    facets = set()
+    for kind, text in (('genre', genre), ('language', language)):
+        for value in (text or '').split(','):
+            value = ' '.join(value.split()).casefold()
+            if value:
+                facets.add((kind, value))
+    return sorted(facets)
+
+
+def index_movie_facets(cursor, movie_id, genre, language):
+    cursor.execute("DELETE FROM movie_facets WHERE movie_id = ?", (movie_id,))
+    cursor.executemany("INSERT INTO movie_facets (kind, value, movie_id) VALUES (?, ?, ?)",
+                       [(kind, value, movie_id) for kind, value in movie_facets(genre, language)])
+
+
+def rebuild_movie_search(cursor):
+    # Recompute the full-text index and the facets from the movies table
+    cursor.execute("INSERT INTO movies_fts (movies_fts) VALUES ('rebuild')")
+    cursor.execute("DELETE FROM movie_facets")
+    for movie_id, genre, language in cursor.execute("SELECT id, genre, language FROM movies").fetchall():
+        index_movie_facets(cursor, movie_id, genre, language)
+
+
+def create_booking_journal(cursor):
+    # Append-only log of holds, bookings and cancellations, and snapshots of
+    # the seat and sales state derived from it (see journal.py). Bookings
+    # made before the journal existed are covered by the first snapshot,
+    # taken here.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS booking_events (
+        seq INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        showing_id INTEGER,
+        movie_id INTEGER,
+        booking_id INTEGER,
+        hold_token TEXT,
+        seats TEXT NOT NULL,
+        amount REAL NOT NULL DEFAULT 0,
+        created_at REAL NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS journal_snapshots (
+        seq INTEGER PRIMARY KEY,
+        created_at REAL NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS snapshot_showings (
+        snapshot_seq INTEGER NOT NULL,
+        showing_id INTEGER NOT NULL,
+        seat_bitmap BLOB,
+        available_seats INTEGER NOT NULL,
+        PRIMARY KEY (snapshot_seq, showing_id)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS snapshot_sales (
+        snapshot_seq INTEGER NOT NULL,
+        movie_id INTEGER NOT NULL,
+        bookings INTEGER NOT NULL,
+        tickets INTEGER NOT NULL,
+        revenue REAL NOT NULL,
+        PRIMARY KEY (snapshot_seq, movie_id)
+    ) WITHOUT ROWID
+    ''')
+    journal.take_snapshot(cursor)
+
+
+def add_booking_cancellations(cursor):
+    # A cancelled booking keeps its row with the time it was cancelled.
+    # Deleting it let SQLite hand the freed largest id to the next booking,
+    # so a repeated cancel could hit another customer's booking. The sales
+    # triggers now skip cancelled rows, and cancelling takes a booking out of
+    # the figures through the update triggers.
+    cursor.execute("ALTER TABLE bookings ADD COLUMN cancelled_at TEXT")
+    for name in ('insert', 'delete', 'update'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS trg_bookings_sales_{name}")
+    cursor.execute(f'''CREATE TRIGGER trg_bookings_sales_insert AFTER INSERT ON bookings
+        WHEN NEW.cancelled_at IS NULL BEGIN {sales_trigger_body('NEW', 1)} END''')
+    cursor.execute(f'''CREATE TRIGGER trg_bookings_sales_delete AFTER DELETE ON bookings
+        WHEN OLD.cancelled_at IS NULL BEGIN {sales_trigger_body('OLD', -1)} END''')
+    # An update takes the old row out and puts the new one in, each only if live
+    columns = "movie_id, seats, total_amount, booking_date, cancelled_at"
+    cursor.execute(f'''CREATE TRIGGER trg_bookings_sales_update_old AFTER UPDATE OF {columns} ON bookings
+        WHEN OLD.cancelled_at IS NULL BEGIN {sales_trigger_body('OLD', -1)} END''')
+    cursor.execute(f'''CREATE TRIGGER trg_bookings_sales_update_new AFTER UPDATE OF {columns} ON bookings
+        WHEN NEW.cancelled_at IS NULL BEGIN {sales_trigger_body('NEW', 1)} END''')
+
+
+MIGRATIONS = [
+    (1, 'base tables', create_base_tables),
+    (2, 'seat inventory', create_seat_inventory),
+    (3, 'booking indexes', add_booking_indexes),
+    (4, 'sales summary', create_sales_summary),
+    (5, 'screens and showings', create_screens_and_showings),
+    (6, 'seat holds', create_seat_holds),
+    (7, 'seat bitmaps', add_seat_bitmaps),
+    (8, 'poster store', create_poster_store),
+    (9, 'booking history indexes', add_booking_history_indexes),
+    (10, 'movie search', create_movie_search),
+    (11, 'booking journal', create_booking_journal),
+    (12, 'booking cancellations', add_booking_cancellations),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TEXT NOT NULL
+    )
+    ''')
+    return cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").fetchone()[0]
+
+
+def is_current(conn):
+    # True once setup() has brought the database to this version of the schema
+    return conn.execute("PRAGMA user_version").fetchone()[0] == LATEST_VERSION
+
+
+def mark_current(cursor):
+    # Part of the setup transaction, so it is only stored if setup completes
+    cursor.execute(f"PRAGMA user_version = {LATEST_VERSION}")
+
+
+def migrate(conn):
+    # Bring the schema up to date; returns the versions that were applied
+    cursor = conn.cursor()
+    version = current_version(cursor)
+    applied = []
+    for number, name, step in MIGRATIONS:
+        if number <= version:
+            continue
+        step(cursor)
+        cursor.execute("INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                       (number, name, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        applied.append(number)
+    return applied
+
+
+# Queries on the hot paths and the index each one is expected to use.
+# check_query_plans() runs EXPLAIN QUERY PLAN on them so a schema change that
+# silently turns one into a full table scan is caught.
+EXPECTED_PLANS = [
+    ("SELECT id FROM bookings WHERE cancelled_at IS NULL AND movie_id = ? AND (booking_date, id) < (?, ?) ORDER BY booking_date DESC, id DESC LIMIT 50",
+     (1, '2024-02-01', 10), 'idx_bookings_movie_date'),
+    ("SELECT id FROM bookings WHERE cancelled_at IS NULL AND booking_date >= ? AND booking_date < ? ORDER BY booking_date DESC, id DESC LIMIT 50",
+     ('2024-01-01', '2024-02-01'), 'idx_bookings_booking_date'),
+    ("SELECT id FROM bookings WHERE cancelled_at IS NULL AND phone = ? ORDER BY booking_date DESC, id DESC LIMIT 50", ('555',), 'idx_bookings_phone_date'),
+    ("SELECT id FROM bookings WHERE cancelled_at IS NULL AND email = ? ORDER BY booking_date DESC, id DESC LIMIT 50", ('a@b.c',), 'idx_bookings_email_date'),
+    ("SELECT seat_id FROM seat_inventory WHERE showing_id = ? AND status = 'booked'", (1,), 'sqlite_autoindex_seat_inventory_1'),
+    # Journal replay (rebuild_seat_inventory, rebuild_sales_days)
+    ("SELECT id, seats FROM bookings WHERE showing_id = ? AND cancelled_at IS NULL", (1,), 'idx_bookings_showing_id'),
+    ("SELECT COUNT(*) FROM bookings WHERE movie_id = ? AND booking_date >= ? AND booking_date < date(?, '+1 day') AND cancelled_at IS NULL",
+     (1, '2024-01-01', '2024-01-01'), 'idx_bookings_movie_date'),
+    ("SELECT id FROM showings WHERE movie_id = ? ORDER BY start_time", (1,), 'idx_showings_movie_id'),
+    ("DELETE FROM seat_holds WHERE expires_at <= ?", (0,), 'idx_seat_holds_expires_at'),
+    ("SELECT movie_id FROM movie_facets WHERE kind = ? AND value = ?", ('genre', 'drama'), 'movie_facets USING PRIMARY KEY'),
+    ("DELETE FROM movie_facets WHERE movie_id = ?", (1,), 'idx_movie_facets_movie_id'),
+    ("SELECT 1 FROM movies WHERE poster_hash = ?", ('0' * 64,), 'idx_movies_poster_hash'),
+    ("SELECT data FROM posters WHERE hash = ? AND variant = ?", ('0' * 64, 'card'), 'sqlite_autoindex_posters_1'),
+    ("SELECT day, movie_id, bookings, tickets, revenue FROM sales_daily WHERE day >= ? AND day <= ?", ('2024-01-01', '2024-01-31'), 'idx_sales_daily_day'),
+]
+
+
+def explain(conn, sql, params=()):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def check_query_plans(conn):
+    # Returns a list of (sql, plan) for every query that missed its index
+    failures = []
+    for sql, params, index in EXPECTED_PLANS:
+        plan = explain(conn, sql, params)
+        if not any(index in step for step in plan):
+            failures.append((sql, plan))
+    return failures
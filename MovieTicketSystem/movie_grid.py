@@ -0,0 +1,277 @@
+import functools
+import tkinter as tk
+from tkinter import ttk
+import booking_service
+from thumbnails import thumbnail_cache, decode_thumbnail
+
+# Card geometry, including the 10px padding around each card
+CARD_WIDTH = 300
+CARD_HEIGHT = 200
+CARD_PADDING = 10
+COLUMNS = 3  # 3 movies per row
+
+# Rows built above and below the visible area so short scrolls stay smooth
+BUFFER_ROWS = 1
+
+
+def load_poster(poster_hash):
+    # Runs on a worker thread: fetch the poster and decode it
+    img_data = booking_service.get_poster(poster_hash)
+    return decode_thumbnail(img_data) if img_data else None
+
+
+class MovieCard(ttk.Frame):
+    # One movie card. Cards are reused for other movies as the grid scrolls,
+    # so show() only touches what differs from the movie shown before.
+    def __init__(self, parent, worker, on_book):
+        super().__init__(parent, style='Card.TFrame', width=CARD_WIDTH, height=CARD_HEIGHT)
+        self.grid_propagate(False)
+        self.worker = worker
+        self.movie = None
+        self.poster_hash = None
+
+        # Movie thumbnail
+        self.img_label = ttk.Label(self, background='#2c3e50', foreground="#ffffff")
+        self.img_label.grid(row=0, column=0, rowspan=4, padx=10, pady=10)
+
+        # Movie details
+        self.title_label = ttk.Label(self, style='Heading.TLabel', font=('Helvetica', 14, 'bold'))
+        self.title_label.grid(row=0, column=1, sticky="w", padx=5)
+        self.genre_label = ttk.Label(self, foreground="#ffffff", background='#2c3e50')
+        self.genre_label.grid(row=1, column=1, sticky="w", padx=5)
+        self.duration_label = ttk.Label(self, foreground="#ffffff", background='#2c3e50')
+        self.duration_label.grid(row=2, column=1, sticky="w", padx=5)
+        self.price_label = ttk.Label(self, foreground="#ffffff", background='#2c3e50')
+        self.price_label.grid(row=3, column=1, sticky="w", padx=5)
+
+        # Available seats
+        self.seats_label = ttk.Label(self, foreground="#ffffff", background='#2c3e50')
+        self.seats_label.grid(row=4, column=0, columnspan=2, sticky="w", padx=5)
+
+        # Book button
+        book_btn = ttk.Button(self, text="Book Tickets",
+                              command=lambda: on_book(self.movie['id'], self.movie['title'], self.movie['price']))
+        book_btn.grid(row=5, column=0, columnspan=2, pady=10)
+
+    def show(self, movie):
+        if movie == self.movie:
+            return
+        old = self.movie or {}
+        self.movie = movie
+        for label, key, text in ((self.title_label, 'title', "{}"), (self.genre_label, 'genre', "Genre: {}"),
+                                 (self.duration_label, 'duration', "Duration: {}"),
+                                 (self.price_label, 'price', "Price: ${}"),
+                                 (self.seats_label, 'available_seats', "Available Seats: {}")):
+            if old.get(key) != movie[key]:
+                label.configure(text=text.format(movie[key]))
+        if movie['poster_hash'] != self.poster_hash or not old:
+            self._load_poster(movie['poster_hash'])
+
+    def _load_poster(self, poster_hash):
+        # The poster hash is known from the movie row, so a cached thumbnail
+        # is shown at once; otherwise it is filled in once the poster has been
+        # loaded
+        self.poster_hash = poster_hash
+        img_tk = thumbnail_cache.lookup(poster_hash) if poster_hash else None
+        if img_tk is not None:
+            self.img_label.configure(image=img_tk, text="")
+            self.img_label.image = img_tk
+        elif poster_hash:
+            self.img_label.configure(image='', text="Loading...")
+            self.img_label.image = None
+            self.worker.submit(load_poster, poster_hash,
+                               on_done=lambda img: self._show_poster(poster_hash, img),
+                               on_error=lambda e: self._poster_failed(poster_hash, e),
+                               owner=self)
+        else:
+            self.img_label.configure(image='', text="[No Image]")
+            self.img_label.image = None
+
+    def _show_poster(self, poster_hash, img):
+        img_tk = None
+        if img is not None:
+            img_tk = thumbnail_cache.lookup(poster_hash) or thumbnail_cache.store(poster_hash, img)
+        if poster_hash != self.poster_hash:
+            return  # The card shows another movie by now
+        if img_tk is None:
+            self.img_label.configure(text="[No Image]")
+            return
+        self.img_label.configure(image=img_tk, text="")
+        self.img_label.image = img_tk
+
+    def _poster_failed(self, poster_hash, error):
+        print(f"Error loading image: {error}")
+        if poster_hash == self.poster_hash:
+            self.img_label.configure(text="[No Image]")
+
+
+class MovieGrid(ttk.Frame):
+    # Scrollable grid of movie cards that only builds the cards in view, for
+    # the whole catalog or the results of a search. Movie rows are fetched a
+    # page at a time with LIMIT/OFFSET and posters are
+    # loaded when their card is first shown, so the cost of opening Home does
+    # not grow with the size of the catalog. All queries and image decoding
+    # run on the background worker. Cards that scroll out of view are kept
+    # hidden and reused for the next movies that scroll in, and refresh()
+    # re-reads the rows in view and updates their cards in place.
+    def __init__(self, parent, worker, on_book):
+        super().__init__(parent)
+        self.worker = worker
+        self.on_book = on_book
+
+        self.canvas = tk.Canvas(self, bg="#1a1a1a", highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_scroll)
+
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.cards = {}    # index in the catalog -> canvas window id and MovieCard
+        self.spare = []    # Hidden (window id, MovieCard) pairs ready for reuse
+        self.movies = {}   # index in the catalog -> movie row
+        self.filters = {}  # search words, genre and language passed to list_movies
+        self.total = 0
+        self._refresh_pending = False
+        self._fetching = False
+        self._loaded = False
+        self._generation = 0  # Bumped by every reload so results of an old search are dropped
+
+        self.loading_label = ttk.Label(self.canvas, text="Loading movies...")
+        self.canvas.create_window(10, 10, window=self.loading_label, anchor="nw")
+
+        self.canvas.bind("<Configure>", lambda e: self._schedule_refresh())
+        self.reload()
+
+    def search(self, query=None, genre=None, language=None):
+        # Show only matching movies, best matches first
+        self.filters = {'query': query, 'genre': genre, 'language': language}
+        self.reload()
+
+    def reload(self):
+        # Forget everything and start again from the top of the catalog
+        for index in list(self.cards):
+            self._hide_card(index)
+        self._loaded = False
+        self._fetch_total(keep_position=False)
+
+    def refresh(self):
+        # Re-read the catalog for the same search, keeping the scroll position
+        # and the cards on screen; cards whose movie changed (seats sold,
+        # price edited) are updated when the new rows arrive
+        self._fetch_total(keep_position=True)
+
+    def _fetch_total(self, keep_position):
+        self.movies.clear()
+        self._fetching = False
+        self._generation += 1
+        generation = self._generation
+        self.worker.submit(functools.partial(booking_service.count_movies, **self.filters),
+                           on_done=lambda total: self._set_total(generation, total, keep_position), owner=self)
+
+    def _set_total(self, generation, total, keep_position=False):
+        if generation != self._generation:
+            return
+        self._loaded = True
+        self._apply_total(total)
+        if not keep_position:
+            self.canvas.yview_moveto(0)
+        self._schedule_refresh()
+
+    def _apply_total(self, total):
+        # Size the canvas for `total` movies and drop the cards past the end
+        self.total = total
+        for index in [i for i in self.cards if i >= total]:
+            self._hide_card(index)
+        if total:
+            self.loading_label.configure(text="")
+        elif any(self.filters.values()):
+            self.loading_label.configure(text="No movies match your search.")
+        else:
+            self.loading_label.configure(text="No movies available.")
+        rows = (self.total + COLUMNS - 1) // COLUMNS
+        self.canvas.configure(scrollregion=(0, 0, COLUMNS * (CARD_WIDTH + 2 * CARD_PADDING),
+                                            rows * (CARD_HEIGHT + 2 * CARD_PADDING)))
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        # Coalesce bursts of scroll events into one refresh
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.after_idle(self._refresh)
+
+    def _visible_range(self):
+        row_height = CARD_HEIGHT + 2 * CARD_PADDING
+        top = self.canvas.canvasy(0)
+        bottom = top + max(self.canvas.winfo_height(), row_height)
+        first_row = max(int(top // row_height) - BUFFER_ROWS, 0)
+        last_row = int(bottom // row_height) + BUFFER_ROWS
+        return first_row * COLUMNS, min((last_row + 1) * COLUMNS, self.total)
+
+    def _refresh(self):
+        self._refresh_pending = False
+        if not self.winfo_exists() or not self._loaded:
+            return
+        start, end = self._visible_range()
+
+        # Put away cards that scrolled out of range
+        for index in [i for i in self.cards if i < start or i >= end]:
+            self._hide_card(index)
+        for index in [i for i in self.movies if i < start or i >= end]:
+            del self.movies[index]
+
+        for index in range(start, end):
+            if index in self.movies:
+                self._show_card(index, self.movies[index])
+
+        # Fetch the rows we do not have yet in a single query. Only one fetch is
+        # in flight at a time; its completion triggers another refresh.
+        missing = [i for i in range(start, end) if i not in self.movies]
+        if missing and not self._fetching:
+            self._fetching = True
+            offset, limit = missing[0], missing[-1] - missing[0] + 1
+            generation = self._generation
+            self.worker.submit(functools.partial(booking_service.list_movies, offset, limit, **self.filters),
+                               on_done=lambda movies: self._rows_loaded(generation, offset, limit, movies),
+                               on_error=self._fetch_failed, owner=self)
+
+    def _rows_loaded(self, generation, offset, limit, movies):
+        if generation != self._generation:
+            return
+        self._fetching = False
+        for i, movie in enumerate(movies):
+            self.movies[offset + i] = movie
+        if len(movies) < limit:
+            # Movies were deleted since the count: the catalog now ends
+            # here, so the rows past it are never asked for again
+            self._apply_total(offset + len(movies))
+        self._schedule_refresh()
+
+    def _fetch_failed(self, error):
+        self._fetching = False
+        print(f"Error loading movies: {error}")
+
+    def _show_card(self, index, movie):
+        # Show the movie at `index`, reusing its card or a spare one
+        if index in self.cards:
+            self.cards[index][1].show(movie)
+            return
+        row, col = divmod(index, COLUMNS)
+        x = col * (CARD_WIDTH + 2 * CARD_PADDING) + CARD_PADDING
+        y = row * (CARD_HEIGHT + 2 * CARD_PADDING) + CARD_PADDING
+        if self.spare:
+            window_id, card = self.spare.pop()
+            self.canvas.coords(window_id, x, y)
+            self.canvas.itemconfigure(window_id, state='normal')
+        else:
+            card = MovieCard(self.canvas, self.worker, self.on_book)
+            window_id = self.canvas.create_window(x, y, window=card, anchor="nw")
+        card.show(movie)
+        self.cards[index] = (window_id, card)
+
+    def _hide_card(self, index):
+        window_id, card = self.cards.pop(index)
+        self.canvas.itemconfigure(window_id, state='hidden')
+        self.spare.append((window_id, card))
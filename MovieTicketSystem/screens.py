@@ -0,0 +1,175 @@
+import tkinter as tk
+from tkinter import ttk
+import booking_service
+import venues
+from movie_grid import MovieGrid
+from booking_history import BookingHistory
+from analytics_panel import AnalyticsPanel
+
+
+class ScreenManager:
+    # Keeps the app's main screens alive between visits. Each screen is built
+    # the first time it is shown and hidden (not destroyed) when the user
+    # navigates away; showing it again calls its refresh() with the new
+    # arguments, which updates the widgets in place from fresh data. A screen
+    # may define on_hide(), called when it is hidden.
+    #
+    # One-off pages such as forms get an empty frame from blank() instead,
+    # which is destroyed when anything else is shown.
+    def __init__(self, parent):
+        self.parent = parent
+        self.screens = {}
+        self.current = None
+        self._blank = None
+
+    def show(self, name, factory, *args, **kwargs):
+        screen = self.screens.get(name)
+        if screen is None:
+            screen = self.screens[name] = factory(self.parent)
+        if screen is not self.current:
+            self._hide_current()
+            screen.pack(fill=tk.BOTH, expand=True)
+            self.current = screen
+        screen.refresh(*args, **kwargs)
+        return screen
+
+    def blank(self):
+        self._hide_current()
+        self._blank = ttk.Frame(self.parent)
+        self._blank.pack(fill=tk.BOTH, expand=True)
+        return self._blank
+
+    def _hide_current(self):
+        if self._blank is not None:
+            self._blank.destroy()
+            self._blank = None
+        if self.current is not None:
+            self.current.pack_forget()
+            if hasattr(self.current, 'on_hide'):
+                self.current.on_hide()
+            self.current = None
+
+
+class HomeScreen(ttk.Frame):
+    # Movie search bar and grid. Coming back to it keeps the search and the
+    # scroll position and refreshes the cards in view.
+    def __init__(self, parent, worker, on_book):
+        super().__init__(parent)
+        self.worker = worker
+
+        # Header
+        ttk.Label(self, text="Available Movies", style='Heading.TLabel').pack(pady=10)
+
+        # Search bar: words are matched against title, description and genre;
+        # genre and language come from the facet index
+        search_frame = ttk.Frame(self)
+        search_frame.pack(fill=tk.X, pady=5)
+
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
+        self.search_entry = ttk.Entry(search_frame, width=30)
+        self.search_entry.pack(side=tk.LEFT, padx=5)
+
+        self.facet_boxes = {}
+        for kind, label in (('genre', "Genre:"), ('language', "Language:")):
+            ttk.Label(search_frame, text=label).pack(side=tk.LEFT, padx=5)
+            box = ttk.Combobox(search_frame, values=["All"], state='readonly', width=15)
+            box.set("All")
+            box.pack(side=tk.LEFT, padx=5)
+            box.bind("<<ComboboxSelected>>", self.search)
+            self.facet_boxes[kind] = box
+
+        self.search_entry.bind("<Return>", self.search)
+        ttk.Button(search_frame, text="Search", command=self.search).pack(side=tk.LEFT, padx=5)
+
+        # Movies grid; only the cards in view are built
+        self.movie_grid = MovieGrid(self, worker, on_book=on_book)
+        self.movie_grid.pack(fill=tk.BOTH, expand=True)
+        self._shown = False
+
+    def refresh(self):
+        # The grid loads itself when it is created
+        if self._shown:
+            self.movie_grid.refresh()
+        self._shown = True
+        for kind, box in self.facet_boxes.items():
+            self.worker.submit(booking_service.list_facets, kind,
+                               on_done=lambda facets, box=box: box.configure(values=["All"] + [f['value'].title() for f in facets]),
+                               owner=box)
+
+    def search(self, *args):
+        facets = {kind: box.get() if box.get() != "All" else None for kind, box in self.facet_boxes.items()}
+        self.movie_grid.search(self.search_entry.get().strip() or None, **facets)
+
+
+class DashboardScreen(ttk.Frame):
+    # Sales figures, reports and links to the admin pages. Refreshing re-reads
+    # the figures and updates the widgets already on screen.
+    def __init__(self, parent, worker, on_manage_movies, on_manage_bookings):
+        super().__init__(parent)
+        self.worker = worker
+        self._generation = 0
+
+        # Header
+        ttk.Label(self, text="Admin Dashboard", style='Heading.TLabel').pack(pady=10)
+
+        # Dashboard Frame
+        dashboard_frame = ttk.Frame(self)
+        dashboard_frame.pack(pady=20)
+
+        # Sales figures are filled in once the background query returns
+        sales_frame = ttk.Frame(dashboard_frame)
+        sales_frame.pack()
+        self.total_label = ttk.Label(sales_frame, text="Loading sales...")
+        self.total_label.pack(pady=5)
+
+        # Occupancy, revenue and seat reports
+        self.analytics = AnalyticsPanel(dashboard_frame, worker)
+        self.analytics.pack(fill=tk.BOTH, expand=True)
+
+        # Buttons to Manage Movies and Bookings
+        ttk.Button(dashboard_frame, text="Manage Movies", command=on_manage_movies).pack(pady=10)
+        ttk.Button(dashboard_frame, text="Manage Bookings", command=on_manage_bookings).pack(pady=10)
+
+    def refresh(self):
+        self._generation += 1
+        generation = self._generation
+        # Chain-wide figures when running one database per venue
+        self.worker.submit(venues.sales_summary,
+                           on_done=lambda summary: self._show_sales(generation, summary),
+                           on_error=lambda e: self.total_label.configure(text=f"Could not load sales: {e}"),
+                           owner=self)
+        self.analytics.refresh()
+
+    def _show_sales(self, generation, summary):
+        if generation != self._generation:
+            return
+
+        # Total Sales
+        self.total_label.configure(text=f"Total Sales: ${summary['total_sales']:.2f}")
+
+        # Movie-wise purchases are in the reports; they only show these
+        # counts when the reports cannot be computed
+        self.analytics.show_purchases(summary['movie_purchases'])
+
+
+class BookingsScreen(ttk.Frame):
+    # Admin booking history. Refreshing keeps the filters and reloads the
+    # first page.
+    def __init__(self, parent, worker, on_back):
+        super().__init__(parent)
+
+        # Header
+        ttk.Label(self, text="Manage Bookings", style='Heading.TLabel').pack(pady=10)
+
+        ttk.Button(self, text="Back to Dashboard", command=on_back).pack(anchor="w", pady=5)
+
+        # Bookings are paged in as the table scrolls
+        self.booking_history = BookingHistory(self, worker)
+        self.booking_history.pack(fill=tk.BOTH, expand=True)
+        self._shown = False
+
+    def refresh(self):
+        # The table loads itself when it is created
+        if self._shown:
+            self.booking_history.refresh()
+        self._shown = True
@@ -0,0 +1,54 @@
+# Seat layouts of the screens. A layout is stored as text, one line per row
+# from the front (nearest the screen) to the back. Each character is a seat
+# ('S') or a gap such as an aisle ('.'). Rows are lettered A, B, C... and seats
+# are numbered from the left, counting seats only, so a row "SS.SS" holds
+# A1 A2 (gap) A3 A4.
+
+SEAT = 'S'
+GAP = '.'
+
+# Seats per row when a layout is generated from a capacity
+DEFAULT_SEATS_PER_ROW = 10
+
+
+def row_label(index):
+    # A..Z, then AA, AB... for very large auditoria
+    label = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        label = chr(65 + rem) + label
+    return label
+
+
+def parse_layout(layout):
+    # Returns a list of rows; each row is a list of seat ids with None for gaps
+    rows = []
+    for r, line in enumerate(line.strip() for line in layout.strip().splitlines()):
+        if not line or any(ch not in (SEAT, GAP) for ch in line):
+            raise ValueError(f"Invalid layout row {r + 1}: {line!r}")
+        number = 0
+        row = []
+        for ch in line:
+            if ch == SEAT:
+                number += 1
+                row.append(f"{row_label(r)}{number}")
+            else:
+                row.append(None)
+        rows.append(row)
+    if not rows:
+        raise ValueError("Layout has no rows")
+    return rows
+
+
+def default_layout(capacity, seats_per_row=DEFAULT_SEATS_PER_ROW):
+    # Rectangular layout with `capacity` seats, the last row possibly shorter
+    full_rows, rest = divmod(capacity, seats_per_row)
+    lines = [SEAT * seats_per_row] * full_rows
+    if rest:
+        lines.append(SEAT * rest)
+    return '\n'.join(lines)
+
+
+def seat_count(layout):
+    return layout.count(SEAT)
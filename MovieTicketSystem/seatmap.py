@@ -0,0 +1,177 @@
+import base64
+import functools
+import seat_layouts
+
+# Compact seat occupancy for a showing: one bit per seat, set when the seat is
+# sold. Bits follow the layout order (rows from the screen backwards, seats
+# left to right, gaps skipped), bit i living in byte i // 8 under mask
+# 1 << (i % 8). A 2,000 seat auditorium fits in 250 bytes, which is stored on
+# the showing row and read back in one go instead of one row per sold seat.
+
+
+# How much a row away from the middle row counts against a block compared
+# with a seat away from the centre line
+ROW_WEIGHT = 1.0
+
+
+class SeatIndex:
+    # Bit positions of the seats of one layout. seat_ids[i] is the seat at bit
+    # i; segments holds, per row, the (first bit, length, first column) runs
+    # of seats that sit next to each other without a gap. Columns count gaps
+    # too, so they give a seat's physical place across the auditorium.
+    def __init__(self, layout):
+        self.layout = layout
+        self.rows = seat_layouts.parse_layout(layout)
+        self.width = max(len(row) for row in self.rows)
+        self.seat_ids = []
+        self.segments = []
+        for row in self.rows:
+            runs = []
+            start = start_col = None
+            for col, seat in enumerate(row):
+                if seat is None:
+                    if start is not None:
+                        runs.append((start, len(self.seat_ids) - start, start_col))
+                        start = None
+                    continue
+                if start is None:
+                    start, start_col = len(self.seat_ids), col
+                self.seat_ids.append(seat)
+            if start is not None:
+                runs.append((start, len(self.seat_ids) - start, start_col))
+            self.segments.append(runs)
+        self.positions = {seat: i for i, seat in enumerate(self.seat_ids)}
+        # Rows from the middle outwards, the order best_available visits them
+        centre_row = (len(self.rows) - 1) / 2
+        self.rows_from_centre = sorted(range(len(self.rows)), key=lambda r: abs(r - centre_row))
+
+    def __len__(self):
+        return len(self.seat_ids)
+
+    def __contains__(self, seat):
+        return seat in self.positions
+
+    def positions_of(self, seats):
+        # Raises KeyError for a seat that is not in the layout
+        return [self.positions[seat] for seat in seats]
+
+    def seats_at(self, positions):
+        return [self.seat_ids[i] for i in positions]
+
+
+@functools.lru_cache(maxsize=64)
+def seat_index(layout):
+    # Layouts are immutable once a screen exists, so each is indexed once
+    return SeatIndex(layout)
+
+
+class SeatBitmap:
+    def __init__(self, size, data=None):
+        self.size = size
+        nbytes = (size + 7) // 8
+        # NULL in the database means nothing has been sold yet
+        self.bits = bytearray(data) if data else bytearray(nbytes)
+        if len(self.bits) != nbytes:
+            raise ValueError(f"Seat bitmap has {len(self.bits)} bytes, expected {nbytes}")
+
+    @classmethod
+    def decode(cls, size, text):
+        return cls(size, base64.b64decode(text))
+
+    def is_set(self, i):
+        return self.bits[i >> 3] >> (i & 7) & 1
+
+    def set(self, positions):
+        for i in positions:
+            self.bits[i >> 3] |= 1 << (i & 7)
+
+    def clear(self, positions):
+        for i in positions:
+            self.bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    def taken(self, positions):
+        return [i for i in positions if self.bits[i >> 3] >> (i & 7) & 1]
+
+    def all_free(self, positions):
+        return not self.taken(positions)
+
+    def count(self):
+        return int.from_bytes(self.bits, 'little').bit_count()
+
+    def set_positions(self):
+        # Only bytes with a sold seat are unpacked
+        for byte_index, byte in enumerate(self.bits):
+            while byte:
+                low = byte & -byte
+                yield (byte_index << 3) + low.bit_length() - 1
+                byte ^= low
+
+    def as_int(self):
+        # The whole bitmap as one integer, bit i being seat i
+        return int.from_bytes(self.bits, 'little')
+
+    def best_available(self, index, n, blocked=()):
+        # Bit positions of the n unsold seats side by side whose middle is
+        # closest to the centre of the auditorium, or None if no row has room.
+        # One pass over the row bitmaps with integer bit operations: ANDing a
+        # segment's free bits with shifted copies of itself leaves a bit at
+        # every seat that starts n free seats, and within a segment the best of
+        # those is simply the one nearest the centred block. Rows are visited
+        # from the middle outwards and the scan stops once a row is too far
+        # away to beat the best block found. `blocked` are extra positions to
+        # avoid, such as seats other customers are holding.
+        if n <= 0 or n > self.size:
+            return None
+        taken = self.as_int()
+        for i in blocked:
+            taken |= 1 << i
+        centre_col = (index.width - 1) / 2
+        centre_row = (len(index.rows) - 1) / 2
+        target_col = round(centre_col - (n - 1) / 2)
+        best = None
+        for row in index.rows_from_centre:
+            dy = (row - centre_row) * ROW_WEIGHT
+            if best is not None and dy * dy >= best[0]:
+                break
+            for seg_start, seg_length, seg_col in index.segments[row]:
+                if seg_length < n:
+                    continue
+                starts = ~(taken >> seg_start) & ((1 << seg_length) - 1)
+                width = 1
+                while width < n and starts:
+                    step = min(width, n - width)
+                    starts &= starts >> step
+                    width += step
+                if not starts:
+                    continue
+                # Nearest block start at or left of the target, and right of it
+                target = min(max(target_col - seg_col, 0), seg_length - 1)
+                candidates = []
+                left = starts & ((2 << target) - 1)
+                if left:
+                    candidates.append(left.bit_length() - 1)
+                right = starts >> target
+                if right:
+                    candidates.append(target + (right & -right).bit_length() - 1)
+                for offset in candidates:
+                    dx = seg_col + offset + (n - 1) / 2 - centre_col
+                    score = dx * dx + dy * dy
+                    if best is None or score < best[0]:
+                        best = (score, seg_start + offset)
+        if best is None:
+            return None
+        return list(range(best[1], best[1] + n))
+
+    def to_bytes(self):
+        return bytes(self.bits)
+
+    def encode(self):
+        # Text form for JSON clients
+        return base64.b64encode(self.bits).decode('ascii')
+
+
+def bitmap_from_seats(index, seats):
+    # Bitmap with the given seat ids set; seats not in the layout are ignored
+    bitmap = SeatBitmap(len(index))
+    bitmap.set(index.positions[seat] for seat in seats if seat in index.positions)
+    return bitmap
@@ -0,0 +1,38 @@
+# Checks that the hot queries keep using their indexes
+#
+#   cd MovieTicketSystem && python -m unittest discover tests
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import migrations
+
+
+class QueryPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='movie-test-')
+        self.db = database.Database(os.path.join(self.tmpdir, 'plans.db'))
+        self.db.setup()
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_new_database(self):
+        self.assertEqual(migrations.check_query_plans(self.db.connection()), [])
+
+    def test_after_analyze(self):
+        # ANALYZE gives the planner real statistics, which can change its choices
+        conn = self.db.connection()
+        conn.execute("ANALYZE")
+        self.assertEqual(migrations.check_query_plans(conn), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
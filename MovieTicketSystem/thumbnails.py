@@ -0,0 +1,78 @@
+import io
+import threading
+from collections import OrderedDict
+
+# PIL is imported where it is used rather than here: it is slow to load and
+# the app can start, and show movies without posters, before it is needed
+
+# Size of the posters shown on movie cards
+THUMBNAIL_SIZE = (100, 150)
+
+# Other poster resolutions stored next to the card image on bulk import
+POSTER_VARIANTS = {'small': (50, 75)}
+
+# Maximum number of decoded thumbnails kept in memory
+MAX_THUMBNAILS = 256
+
+
+def decode_thumbnail(img_data):
+    # Pure PIL work, safe to run on a worker thread
+    from PIL import Image
+    img = Image.open(io.BytesIO(img_data))
+    # Posters uploaded through the app are already stored at card size
+    if img.size != THUMBNAIL_SIZE:
+        img = img.resize(THUMBNAIL_SIZE, Image.LANCZOS)
+    img.load()
+    return img
+
+
+def encode_poster(img_data, size=THUMBNAIL_SIZE):
+    # Scale an uploaded image to card size (or `size`) and store it as PNG,
+    # the form posters are kept in the database. Pure PIL work, safe to run on
+    # a worker thread or in another process.
+    from PIL import Image
+    img = Image.open(io.BytesIO(img_data))
+    img = img.resize(size, Image.LANCZOS)
+    out = io.BytesIO()
+    img.save(out, format='PNG')
+    return out.getvalue()
+
+
+class ThumbnailCache:
+    # Least-recently-used cache of decoded movie posters, keyed by the poster's
+    # hash in the poster store. A changed poster has a new hash, so a stale
+    # thumbnail is never returned, and movies sharing a poster share an entry.
+    def __init__(self, max_entries=MAX_THUMBNAILS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        with self._lock:
+            img_tk = self._entries.get(key)
+            if img_tk is not None:
+                self._entries.move_to_end(key)
+            return img_tk
+
+    def store(self, key, img):
+        # Creates the Tk image, so this must run on the UI thread
+        from PIL import ImageTk
+        img_tk = ImageTk.PhotoImage(img)
+        with self._lock:
+            self._entries[key] = img_tk
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return img_tk
+
+    def get(self, key, img_data):
+        return self.lookup(key) or self.store(key, decode_thumbnail(img_data))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+thumbnail_cache = ThumbnailCache()
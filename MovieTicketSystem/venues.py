@@ -0,0 +1,199 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import database
+import booking_service
+from booking_service import BookingError
+
+# Chain mode: every venue (cinema) keeps its movies, showings and bookings in
+# its own database file, <venue>.db in one directory, so venues never queue
+# behind each other for the SQLite write lock. A terminal books against its
+# own venue's file; the router picks the file for a venue id, and chain-wide
+# admin figures are read from every venue in parallel and added up.
+#
+# Ids (movies, showings, bookings) are only unique within a venue, so
+# anything addressing them across venues must say which venue it means.
+#
+# Environment:
+#   MOVIE_BOOKING_VENUES=DIR   directory of venue databases (turns chain mode on)
+#   MOVIE_BOOKING_VENUE=ID     venue this terminal books for
+
+VENUES_DIR = os.environ.get('MOVIE_BOOKING_VENUES')
+LOCAL_VENUE = os.environ.get('MOVIE_BOOKING_VENUE')
+
+# Venues queried at once by a chain-wide report
+FAN_OUT_THREADS = 8
+
+# Venue ids become file names
+VENUE_ID = re.compile(r'[A-Za-z0-9_-]+')
+
+DB_SUFFIX = '.db'
+
+
+class VenueRouter:
+    def __init__(self, directory, threads=FAN_OUT_THREADS):
+        self.directory = directory
+        self.threads = threads
+        self._dbs = {}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def venues(self):
+        # Venue ids, from the database files in the directory
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-len(DB_SUFFIX)] for name in os.listdir(self.directory)
+                      if name.endswith(DB_SUFFIX) and VENUE_ID.fullmatch(name[:-len(DB_SUFFIX)]))
+
+    def path(self, venue):
+        if not isinstance(venue, str) or not VENUE_ID.fullmatch(venue):
+            raise BookingError("Venue ids may only use letters, digits, '-' and '_'.")
+        return os.path.join(self.directory, venue + DB_SUFFIX)
+
+    def db(self, venue):
+        # The open Database of an existing venue
+        with self._lock:
+            db = self._dbs.get(venue)
+            if db is None:
+                path = self.path(venue)
+                if not os.path.exists(path):
+                    raise BookingError(f"Unknown venue: {venue}")
+                db = self._dbs[venue] = database.Database(path)
+        return db
+
+    def add_venue(self, venue):
+        # Create (or bring up to date) a venue's database
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(venue)
+        with self._lock:
+            db = self._dbs.get(venue)
+            if db is None:
+                db = self._dbs[venue] = database.Database(path)
+        db.setup()
+        return db
+
+    def setup(self):
+        for venue in self.venues():
+            self.db(venue).setup()
+
+    def fan_out(self, func, *args, **kwargs):
+        # {venue: func(*args, db=<venue db>, **kwargs)} for every venue, run
+        # on a thread pool. SQLite releases the GIL while it reads pages, so
+        # venues waiting on the disk or on a writer overlap; small reports
+        # from files already in the page cache gain nothing (see
+        # `benchmark.py venues`).
+        venues = self.venues()
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='venue-fan-out')
+            pool = self._pool
+        futures = [pool.submit(func, *args, db=self.db(venue), **kwargs) for venue in venues]
+        return {venue: future.result() for venue, future in zip(venues, futures)}
+
+    def sales_summary(self):
+        # booking_service.sales_summary for the whole chain, plus each
+        # venue's total. Movies are matched by title across venues.
+        summaries = self.fan_out(booking_service.sales_summary)
+        purchases = {}
+        for summary in summaries.values():
+            for title, count in summary['movie_purchases']:
+                purchases[title] = purchases.get(title, 0) + count
+        return {
+            'total_sales': round(sum(summary['total_sales'] for summary in summaries.values()), 2),
+            'movie_purchases': sorted(purchases.items()),
+            'venue_sales': {venue: summary['total_sales'] for venue, summary in summaries.items()},
+        }
+
+    def dashboard_report(self):
+        # analytics.dashboard_report for the whole chain, built from each
+        # venue's (cached) totals. Movies are matched by title across venues
+        # and have no movie_id; screens keep their venue in their key.
+        import analytics  # Needs NumPy, so only loaded for the reports
+        reports = self.fan_out(analytics.dashboard_report)
+        movies, days, heatmaps = {}, {}, {}
+        hours = [0.0] * 24
+        for venue, report in reports.items():
+            for movie in report['movies']:
+                merged = movies.setdefault(movie['title'], {'title': movie['title'], 'bookings': 0, 'tickets': 0,
+                                                            'capacity': 0, 'revenue': 0.0})
+                for key in ('bookings', 'tickets', 'capacity', 'revenue'):
+                    merged[key] += movie[key]
+            for hour, revenue in enumerate(report['revenue_by_hour']):
+                hours[hour] += revenue
+            for day, revenue in report['revenue_by_day']:
+                days[day] = days.get(day, 0) + revenue
+            for screen_id, heatmap in report['seat_heatmaps'].items():
+                heatmaps[f"{venue}/{screen_id}"] = heatmap
+        for movie in movies.values():
+            movie['revenue'] = round(movie['revenue'], 2)
+            movie['occupancy'] = movie['tickets'] / movie['capacity'] if movie['capacity'] else None
+        return {
+            'movies': sorted(movies.values(), key=lambda movie: (-(movie['occupancy'] or 0), movie['title'])),
+            'revenue_by_hour': [round(revenue, 2) for revenue in hours],
+            'revenue_by_day': [(day, round(revenue, 2)) for day, revenue in sorted(days.items())],
+            'seat_heatmaps': heatmaps,
+            'bookings': sum(report['bookings'] for report in reports.values()),
+        }
+
+    def close(self):
+        with self._lock:
+            dbs, self._dbs = list(self._dbs.values()), {}
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+        for db in dbs:
+            db.close()
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    # The chain's router, or None when the app runs on a single database
+    global _router
+    if _router is None and VENUES_DIR:
+        with _router_lock:
+            if _router is None:
+                _router = VenueRouter(VENUES_DIR)
+    return _router
+
+
+def configure(directory, venue=None):
+    # Switch to chain mode on `directory`. With `venue` the shared database
+    # (database.get_db) becomes that venue's, created if needed, so the rest
+    # of the app books against it unchanged.
+    global _router
+    with _router_lock:
+        if _router is not None:
+            _router.close()
+        _router = VenueRouter(directory)
+    if venue:
+        os.makedirs(directory, exist_ok=True)
+        database.configure(_router.path(venue))
+    return _router
+
+
+def configure_from_environment():
+    if VENUES_DIR:
+        if not LOCAL_VENUE:
+            raise BookingError("Set MOVIE_BOOKING_VENUE to the venue this terminal books for.")
+        configure(VENUES_DIR, LOCAL_VENUE)
+
+
+def sales_summary(db=None):
+    # Dashboard figures: chain-wide in chain mode, else the one database's
+    router = get_router()
+    if router is None or db is not None:
+        return booking_service.sales_summary(db=db)
+    return router.sales_summary()
+
+
+def dashboard_report(db=None):
+    # Dashboard reports (see analytics.py), chain-wide like sales_summary
+    router = get_router()
+    if router is None or db is not None:
+        import analytics
+        return analytics.dashboard_report(db=db)
+    return router.dashboard_report()
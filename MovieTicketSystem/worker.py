@@ -0,0 +1,68 @@
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+
+# Worker threads for database queries and image decoding. Tk widgets may only
+# be touched from the main thread, so finished jobs are handed back through a
+# queue that the Tk event loop polls with root.after.
+
+WORKER_THREADS = 4
+POLL_INTERVAL_MS = 15
+
+
+class BackgroundWorker:
+    def __init__(self, root, max_workers=WORKER_THREADS):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ui-worker')
+        self._results = queue.Queue()
+        self._outstanding = 0  # Only touched from the UI thread
+        self._polling = False
+
+    def submit(self, func, *args, on_done=None, on_error=None, owner=None):
+        # Run func(*args) off the UI thread, then call on_done(result) or
+        # on_error(exception) on the UI thread. If `owner` is a widget that has
+        # been destroyed by the time the job finishes, the callbacks are skipped.
+        submitted = time.perf_counter()
+
+        def run():
+            # Time spent queued behind other jobs is time the user waits too
+            metrics.observe('worker.queue_wait', time.perf_counter() - submitted)
+            return func(*args)
+
+        future = self.executor.submit(run)
+        future.add_done_callback(lambda f: self._results.put((f, on_done, on_error, owner)))
+        self._outstanding += 1
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+        return future
+
+    def _poll(self):
+        while True:
+            try:
+                future, on_done, on_error, owner = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._outstanding -= 1
+            if owner is not None and not owner.winfo_exists():
+                continue
+            try:
+                error = future.exception()
+                if error is not None:
+                    if on_error:
+                        on_error(error)
+                    else:
+                        print(f"Background task failed: {error}")
+                elif on_done:
+                    on_done(future.result())
+            except Exception as e:
+                print(f"Error in background task callback: {e}")
+
+        if self._outstanding > 0:
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)